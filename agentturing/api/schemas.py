@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 class AskRequest(BaseModel):
     question: str
@@ -8,6 +8,7 @@ class AskResponse(BaseModel):
     answer: str
     route: str
     sources: Optional[List[str]] = []
+    usage: Optional[Dict[str, int]] = None
 
 class FeedbackRequest(BaseModel):
     question: str
@@ -0,0 +1,115 @@
+import os
+import re
+import hashlib
+import logging
+from collections import defaultdict
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from agentturing.utils.text import shingles
+
+logger = logging.getLogger(__name__)
+
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))
+# 16 bands x 8 rows puts the LSH candidate threshold near Jaccard 0.7
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "16"))
+DEDUP_JACCARD = float(os.getenv("DEDUP_JACCARD", "0.7"))
+DEDUP_COSINE = float(os.getenv("DEDUP_COSINE", "0.95"))
+
+_MERSENNE = (1 << 31) - 1
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+class MinHasher:
+    """MinHash signatures with universal hashing mod 2^31-1 (fits int64 without overflow)."""
+
+    def __init__(self, num_perm: int = DEDUP_NUM_PERM, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _MERSENNE, size=num_perm, dtype=np.int64)
+        self.b = rng.integers(0, _MERSENNE, size=num_perm, dtype=np.int64)
+
+    def signature(self, items: set) -> np.ndarray:
+        if not items:
+            return np.full(len(self.a), _MERSENNE, dtype=np.int64)
+        hashed = np.array(
+            [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") % _MERSENNE
+             for s in items], dtype=np.int64)
+        return ((np.outer(hashed, self.a) + self.b) % _MERSENNE).min(axis=0)
+
+
+def lsh_candidates(signatures: np.ndarray, bands: int = DEDUP_BANDS) -> set:
+    """Index pairs that collide in at least one band."""
+    rows = signatures.shape[1] // bands
+    pairs = set()
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for i, sig in enumerate(signatures):
+            buckets[sig[band * rows:(band + 1) * rows].tobytes()].append(i)
+        for members in buckets.values():
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    pairs.add((members[x], members[y]))
+    return pairs
+
+
+def find_duplicates(texts: Sequence[str], vectors: np.ndarray, jaccard: float = DEDUP_JACCARD,
+                    cosine: float = DEDUP_COSINE, bands: int = DEDUP_BANDS) -> Dict[str, object]:
+    """
+    Cluster near-duplicate passages. A pair is a duplicate when MinHash/LSH proposes it, its
+    estimated Jaccard similarity is >= ``jaccard``, the embeddings' cosine is >= ``cosine`` and
+    both contain the same numbers (so "solve 2x+3=7" and "solve 2x+4=7" stay distinct).
+    Returns {"groups": [[rep, dup, ...], ...], "candidates": n, "confirmed": n}; the first
+    index of each group is the one to keep.
+    """
+    hasher = MinHasher()
+    signatures = np.stack([hasher.signature(shingles(t)) for t in texts]) if len(texts) else np.zeros((0, 1))
+    candidates = lsh_candidates(signatures, bands) if len(texts) > 1 else set()
+    unit = np.asarray(vectors, dtype=np.float32)
+    unit = unit / np.maximum(np.linalg.norm(unit, axis=1, keepdims=True), 1e-12) if len(unit) else unit
+
+    parent = list(range(len(texts)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    confirmed = 0
+    for i, j in sorted(candidates):
+        if float(np.mean(signatures[i] == signatures[j])) < jaccard:
+            continue
+        if float(unit[i] @ unit[j]) < cosine:
+            continue
+        if sorted(_NUMBER_RE.findall(texts[i])) != sorted(_NUMBER_RE.findall(texts[j])):
+            continue
+        confirmed += 1
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+
+    groups = defaultdict(list)
+    for i in range(len(texts)):
+        groups[find(i)].append(i)
+    return {
+        "groups": [members for members in groups.values() if len(members) > 1],
+        "candidates": len(candidates),
+        "confirmed": confirmed,
+    }
+
+
+def deduplicate(sources: List[str], texts: List[str], vectors: np.ndarray, **kwargs) -> Dict[str, object]:
+    """
+    Keep one passage per near-duplicate group. Returns {"keep": [index, ...],
+    "also_in": {kept source: [duplicate sources]}, "before", "after", "candidates", "confirmed"}.
+    """
+    found = find_duplicates(texts, vectors, **kwargs)
+    dropped, also_in = set(), {}
+    for members in found["groups"]:
+        rep, dups = members[0], members[1:]
+        dropped.update(dups)
+        also_in[sources[rep]] = [sources[d] for d in dups]
+    keep = [i for i in range(len(texts)) if i not in dropped]
+    return {"keep": keep, "also_in": also_in, "before": len(texts), "after": len(keep),
+            "candidates": found["candidates"], "confirmed": found["confirmed"]}
@@ -0,0 +1,154 @@
+import os
+import mmap
+import struct
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Directory holding <store>.dat / <store>.idx pairs; one store per versioned collection
+PASSAGE_STORE_DIR = os.getenv("PASSAGE_STORE_DIR", "agentturing/database/passages")
+# Readers kept mapped per process; older ones (superseded KB versions) are closed when evicted
+PASSAGE_STORE_CACHE = int(os.getenv("PASSAGE_STORE_CACHE", "4"))
+
+# Index record per passage: byte offset and length in the data file
+_RECORD = struct.Struct("<QI")
+
+
+class PassageStore:
+    """
+    Append-only passage text: UTF-8 bytes in ``<name>.dat`` plus fixed-size offset records in
+    ``<name>.idx``; the passage ID is the record number. Reads go through read-only mmaps, so
+    ``get`` returns a zero-copy memoryview and the OS page cache holds the text, not the process.
+    Data is written before its index record, so a reader never sees a pid without its bytes.
+    """
+
+    def __init__(self, name: str, directory: str = PASSAGE_STORE_DIR):
+        self.name = name
+        self.data_path = os.path.join(directory, f"{name}.dat")
+        self.index_path = os.path.join(directory, f"{name}.idx")
+        self._lock = threading.Lock()
+        self._data = None
+        self._index = None
+        self._count = 0
+
+    def exists(self) -> bool:
+        return os.path.exists(self.index_path)
+
+    def append(self, texts: Iterable[str]) -> List[int]:
+        os.makedirs(os.path.dirname(self.data_path) or ".", exist_ok=True)
+        pids, records = [], []
+        with open(self.data_path, "ab") as data, open(self.index_path, "ab") as index:
+            offset = data.tell()
+            first = index.tell() // _RECORD.size
+            for i, text in enumerate(texts):
+                raw = text.encode("utf-8")
+                data.write(raw)
+                records.append(_RECORD.pack(offset, len(raw)))
+                pids.append(first + i)
+                offset += len(raw)
+            data.flush()
+            os.fsync(data.fileno())
+            index.write(b"".join(records))
+        return pids
+
+    def _remap(self):
+        self.close()
+        if not self.exists() or os.path.getsize(self.index_path) == 0:
+            return
+        with open(self.index_path, "rb") as f:
+            self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._count = len(self._index) // _RECORD.size
+        if os.path.getsize(self.data_path):
+            with open(self.data_path, "rb") as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def get(self, pid: int) -> memoryview:
+        """Bytes of passage ``pid`` as a view into the mapped data file."""
+        with self._lock:
+            if pid >= self._count:
+                # Appended after we mapped the files (e.g. a watch-mode delta sync)
+                self._remap()
+            if not 0 <= pid < self._count:
+                raise KeyError(f"passage {pid} not in store {self.name}")
+            offset, length = _RECORD.unpack_from(self._index, pid * _RECORD.size)
+            if length == 0:
+                return memoryview(b"")
+            return memoryview(self._data)[offset:offset + length]
+
+    def text(self, pid: int) -> str:
+        return str(self.get(pid), "utf-8")
+
+    def __len__(self):
+        with self._lock:
+            if self._index is None:
+                self._remap()
+            return self._count
+
+    def close(self):
+        for m in (self._index, self._data):
+            if m is not None:
+                try:
+                    m.close()
+                except BufferError:
+                    # A caller still holds a memoryview; the map is released with it
+                    pass
+        self._index = self._data = None
+        self._count = 0
+
+    def remove(self):
+        self.close()
+        for path in (self.data_path, self.index_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+_stores: "OrderedDict[str, PassageStore]" = OrderedDict()
+_stores_lock = threading.Lock()
+
+
+def _close(store: PassageStore):
+    with store._lock:
+        store.close()
+
+
+def get_store(name: str, directory: str = PASSAGE_STORE_DIR) -> PassageStore:
+    """
+    Process-wide reader for store ``name`` (mappings are shared across requests). At most
+    PASSAGE_STORE_CACHE readers stay open; the least recently used one is closed, so versions
+    left behind by rebuilds and alias swaps release their maps and file handles.
+    """
+    key = os.path.join(directory, name)
+    evicted = []
+    with _stores_lock:
+        if key in _stores:
+            _stores.move_to_end(key)
+        else:
+            _stores[key] = PassageStore(name, directory)
+            while len(_stores) > max(1, PASSAGE_STORE_CACHE):
+                evicted.append(_stores.popitem(last=False)[1])
+        store = _stores[key]
+    for old in evicted:
+        _close(old)
+    return store
+
+
+def evict_store(name: str, directory: str = PASSAGE_STORE_DIR):
+    """Close and forget the cached reader for ``name`` (e.g. before its files are removed)."""
+    with _stores_lock:
+        store = _stores.pop(os.path.join(directory, name), None)
+    if store is not None:
+        _close(store)
+
+
+def payload_text(payload: Optional[Dict[str, Any]], directory: str = PASSAGE_STORE_DIR) -> str:
+    """Text for a KB point: from the passage store when the payload has a pid, else inline."""
+    payload = payload or {}
+    if "pid" in payload and payload.get("store"):
+        try:
+            return get_store(payload["store"], directory).text(payload["pid"])
+        except (KeyError, OSError) as e:
+            logger.warning("Passage %s/%s unavailable: %s", payload["store"], payload["pid"], e)
+    return payload.get("text_excerpt") or payload.get("text", "")
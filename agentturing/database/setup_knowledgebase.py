@@ -1,70 +1,219 @@
 import os
+import time
+import uuid
+import hashlib
 import argparse
+from typing import Dict, Any, Optional
+import numpy as np
 from tqdm import tqdm
-from sentence_transformers import SentenceTransformer
-from agentturing.database.vectorstore import QdrantVectorStore
+from agentturing.database.vectorstore import make_vector_store
+from agentturing.database.passage_store import PassageStore, PASSAGE_STORE_DIR, evict_store
+from agentturing.database.dedup import deduplicate
+from agentturing.model.embeddings import load_embedder
 
 # Path to your KB
 KB_PATH = "agentturing/database/knowledge_base"
 
-# Collection name in Qdrant
+# Collection name in Qdrant (an alias over versioned <name>_v<ms> collections)
 COLLECTION_NAME = os.getenv("QDRANT_COLLECTION", "knowledge_base")
 
 # Embedding model (768 dimensions)
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
 
+# Previous versions kept after a swap (for rollback by repointing the alias)
+KB_KEEP_VERSIONS = int(os.getenv("KB_KEEP_VERSIONS", "1"))
+KB_WATCH_INTERVAL = float(os.getenv("KB_WATCH_INTERVAL", "5"))
+EMBED_BATCH_SIZE = 32
+# Keep full text in point payloads (for API hosts that cannot see PASSAGE_STORE_DIR)
+KB_INLINE_TEXT = os.getenv("KB_INLINE_TEXT", "0") == "1"
+# Merge near-duplicate files on --rebuild (thresholds in agentturing/database/dedup.py)
+KB_DEDUP = os.getenv("KB_DEDUP", "1") == "1"
 
-def load_docs(path: str):
-    docs = []
-    for root, _, files in os.walk(path):
-        for file in files:
-            if file.endswith(".txt"):
-                file_path = os.path.join(root, file)
-                with open(file_path, "r", encoding="utf-8") as f:
-                    docs.append(f.read())
-    return docs
+# Fixed namespace so a file keeps the same point ID across rebuilds and delta syncs
+KB_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "agentturing/knowledge_base")
 
 
-def embed_and_upsert(docs, store, embedder):
-    ids, embeddings, metas = [], [], []
+def point_id(source: str) -> str:
+    return str(uuid.uuid5(KB_NAMESPACE, source))
 
-    for idx, doc in enumerate(tqdm(docs, desc="Embedding documents")):
-        vec = embedder.encode(doc).tolist()
-        ids.append(str(idx))
-        embeddings.append(vec)
-        metas.append({"text": doc})
 
-    store.upsert(ids, embeddings, metas)
+def load_kb_files(path: str) -> Dict[str, Dict[str, str]]:
+    """Relative path -> {"text", "hash"} for every .txt file under ``path``."""
+    files = {}
+    for root, _, names in os.walk(path):
+        for name in sorted(names):
+            if name.endswith(".txt"):
+                file_path = os.path.join(root, name)
+                with open(file_path, "r", encoding="utf-8") as f:
+                    text = f.read()
+                source = os.path.relpath(file_path, path).replace(os.sep, "/")
+                files[source] = {"text": text, "hash": hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]}
+    return files
 
 
-def main(rebuild: bool = False):
+def load_docs(path: str):
+    return [f["text"] for f in load_kb_files(path).values()]
+
+
+def embed_files(files: Dict[str, Dict[str, str]], embedder) -> np.ndarray:
+    sources = list(files)
+    out = []
+    for i in tqdm(range(0, len(sources), EMBED_BATCH_SIZE), desc="Embedding documents", disable=len(sources) < 2):
+        out.append(np.asarray(embedder.encode([files[s]["text"] for s in sources[i:i + EMBED_BATCH_SIZE]])))
+    return np.concatenate(out) if out else np.zeros((0, embedder.get_sentence_embedding_dimension()))
+
+
+def upsert_files(files: Dict[str, Dict[str, str]], vectors, store, collection: str,
+                 passages_dir: str = PASSAGE_STORE_DIR, also_in: Optional[Dict[str, Dict[str, str]]] = None):
+    """Write ``files`` into ``collection`` (a concrete versioned name); text goes to its passage store."""
+    passages = PassageStore(collection, passages_dir)
+    sources = list(files)
+    for i in range(0, len(sources), EMBED_BATCH_SIZE):
+        batch = sources[i:i + EMBED_BATCH_SIZE]
+        texts = [files[s]["text"] for s in batch]
+        pids = passages.append(texts)
+        ids = [point_id(s) for s in batch]
+        metas = []
+        for s, pid in zip(batch, pids):
+            meta = {"pid": pid, "store": collection, "source": s, "hash": files[s]["hash"]}
+            if also_in and s in also_in:
+                # Near-duplicate files merged into this passage: source -> hash
+                meta["also_in"] = also_in[s]
+            if KB_INLINE_TEXT:
+                meta["text"] = files[s]["text"]
+            metas.append(meta)
+        store.upsert(ids, [vectors[i + j].tolist() for j in range(len(batch))], metas, collection=collection)
+
+
+def embed_and_upsert(files: Dict[str, Dict[str, str]], store, embedder, collection: str,
+                     passages_dir: str = PASSAGE_STORE_DIR):
+    upsert_files(files, embed_files(files, embedder), store, collection, passages_dir)
+
+
+def dedup_files(files: Dict[str, Dict[str, str]], vectors) -> Dict[str, Any]:
+    """Drop near-duplicate files (MinHash/LSH + embedding cosine); kept files list the rest in also_in."""
+    sources = list(files)
+    report = deduplicate(sources, [files[s]["text"] for s in sources], vectors)
+    kept = [sources[i] for i in report["keep"]]
+    return {
+        "files": {s: files[s] for s in kept},
+        "vectors": np.asarray(vectors)[report["keep"]],
+        "also_in": {rep: {d: files[d]["hash"] for d in dups} for rep, dups in report["also_in"].items()},
+        "report": report,
+    }
+
+
+def build_version(store, embedder, path: str = KB_PATH, keep: int = KB_KEEP_VERSIONS,
+                  passages_dir: str = PASSAGE_STORE_DIR, dedup: bool = KB_DEDUP) -> Dict[str, Any]:
+    """Build a fresh versioned collection while the alias keeps serving, then swap atomically."""
+    files = load_kb_files(path)
+    target = store.create_versioned_collection(vector_size=embedder.get_sentence_embedding_dimension())
+    try:
+        vectors = embed_files(files, embedder)
+        also_in, removed = None, 0
+        if dedup:
+            deduped = dedup_files(files, vectors)
+            report = deduped["report"]
+            removed = report["before"] - report["after"]
+            print(f"[DEDUP] {report['before']} -> {report['after']} passages: {removed} near-duplicates merged "
+                  f"({100.0 * removed / max(1, report['before']):.1f}% smaller index; "
+                  f"{report['candidates']} LSH candidates, {report['confirmed']} confirmed)")
+            files, vectors, also_in = deduped["files"], deduped["vectors"], deduped["also_in"]
+        upsert_files(files, vectors, store, target, passages_dir, also_in)
+    except Exception:
+        store.drop_collection(target)
+        PassageStore(target, passages_dir).remove()
+        raise
+    store.swap_alias(target, keep=keep)
+    _prune_passage_stores(store, passages_dir)
+    return {"collection": target, "upserted": len(files), "deleted": 0, "deduplicated": removed}
+
+
+def _prune_passage_stores(store, passages_dir: str):
+    """Drop passage files of versions the vector store no longer has (a rebuild also compacts them)."""
+    if not os.path.isdir(passages_dir):
+        return
+    live = set(store.list_versions())
+    prefix = f"{store.collection}_v"
+    for name in os.listdir(passages_dir):
+        stem, ext = os.path.splitext(name)
+        if ext == ".idx" and stem.startswith(prefix) and stem not in live:
+            evict_store(stem, passages_dir)
+            PassageStore(stem, passages_dir).remove()
+
+
+def sync(store, embedder, path: str = KB_PATH, passages_dir: str = PASSAGE_STORE_DIR) -> Dict[str, Any]:
+    """Apply only the delta between the KB files and the live collection (by content hash)."""
+    files = load_kb_files(path)
+    live = store.manifest()
+    target = store.alias_target()
+    stale = {s for s, entry in live.items() if s not in files or entry["hash"] != files[s]["hash"]}
+    # Points rewritten or deleted below; near-duplicates merged into them get their own point back
+    # (deltas are not deduplicated; --rebuild merges them again)
+    rewritten = {live[s]["id"] for s in stale if live[s]["id"] == point_id(s)}
+    changed = {
+        s: f for s, f in files.items()
+        if s not in live or s in stale or (live[s]["id"] in rewritten and live[s]["id"] != point_id(s))
+    }
+    removed = [live[s]["id"] for s in stale if s not in files and live[s]["id"] == point_id(s)]
+    # Kept passages whose merged-away duplicates were edited or deleted: their also_in is rebuilt
+    # from the duplicates that are still unchanged (rewritten points get a fresh payload anyway)
+    pruned = {live[s]["id"] for s in stale if live[s].get("alias") and live[s]["id"] not in rewritten}
+    if changed:
+        # Changed passages are appended; their old bytes stay in the store until the next --rebuild
+        embed_and_upsert(changed, store, embedder, target, passages_dir)
+    if removed:
+        store.delete(removed)
+    for rep in pruned:
+        also_in = {s: entry["hash"] for s, entry in live.items()
+                   if entry.get("alias") and entry["id"] == rep and s not in stale}
+        store.set_payload(rep, {"also_in": also_in})
+    return {"collection": target, "upserted": len(changed), "deleted": len(removed)}
+
+
+def watch_changes(store, embedder, path: str = KB_PATH, interval: float = KB_WATCH_INTERVAL):
+    """Poll the KB directory and sync deltas until interrupted."""
+    print(f"[INFO] Watching {path} every {interval:.0f}s (Ctrl+C to stop)")
+    try:
+        while True:
+            started = time.perf_counter()
+            stats = sync(store, embedder, path)
+            if stats["upserted"] or stats["deleted"]:
+                print(f"[SYNC] +{stats['upserted']} -{stats['deleted']} in {time.perf_counter() - started:.2f}s")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+
+def main(rebuild: bool = False, watch: bool = False, interval: float = KB_WATCH_INTERVAL,
+         path: str = KB_PATH):
     # Initialize embedder
-    embedder = SentenceTransformer(EMBEDDING_MODEL)
+    embedder = load_embedder(EMBEDDING_MODEL)
 
     # Connect to Qdrant
-    vector_size = embedder.get_sentence_embedding_dimension()
-    store = QdrantVectorStore(collection=COLLECTION_NAME)
-    # If rebuild flag is set, delete & recreate collection
-    if rebuild:
-        print(f"[INFO] Rebuilding collection '{COLLECTION_NAME}' in Qdrant...")
-        store.recreate_collection(vector_size=vector_size)
-    else:
-        store._ensure_collection(vector_size=vector_size)
-
-    # Load documents
-    docs = load_docs(KB_PATH)
-    if not docs:
-        print(f"[WARN] No docs found in {KB_PATH}")
+    store = make_vector_store(collection=COLLECTION_NAME)
+    if not load_kb_files(path):
+        print(f"[WARN] No docs found in {path}")
         return
 
-    # Embed + upsert
-    embed_and_upsert(docs, store, embedder)
-    print(f"[SUCCESS] Inserted {len(docs)} docs into collection '{COLLECTION_NAME}'.")
+    # Full rebuilds (and first runs / pre-alias collections) go to a new version behind the alias
+    if rebuild or store.alias_target() is None:
+        print(f"[INFO] Building new version of '{COLLECTION_NAME}' in Qdrant...")
+        stats = build_version(store, embedder, path)
+    else:
+        stats = sync(store, embedder, path)
+    print(f"[SUCCESS] '{COLLECTION_NAME}' -> {stats['collection']}: "
+          f"{stats['upserted']} upserted, {stats['deleted']} deleted.")
+
+    if watch:
+        watch_changes(store, embedder, path, interval)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--rebuild", action="store_true", help="Rebuild collection before inserting")
+    parser.add_argument("--rebuild", action="store_true", help="Build a new collection version and swap the alias")
+    parser.add_argument("--watch", action="store_true", help="Keep running and sync changed/deleted files")
+    parser.add_argument("--interval", type=float, default=KB_WATCH_INTERVAL, help="Watch poll interval (seconds)")
     args = parser.parse_args()
 
-    main(rebuild=args.rebuild)
+    main(rebuild=args.rebuild, watch=args.watch, interval=args.interval)
@@ -0,0 +1,179 @@
+import os
+import time
+import heapq
+import hashlib
+import logging
+import threading
+import contextvars
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Sequence
+
+from agentturing.database.vectorstore import QdrantVectorStore, COLLECTION_NAME
+from agentturing.utils.metrics import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated Qdrant URLs; the order defines the partitioning, so keep it stable
+QDRANT_SHARDS = os.getenv("QDRANT_SHARDS", "")
+# Longest we wait for stragglers before answering from the shards that did reply
+SHARD_QUERY_TIMEOUT_S = float(os.getenv("SHARD_QUERY_TIMEOUT_S", "2"))
+# Queries allowed in flight per shard (stragglers included); a saturated shard is skipped, not queued for
+SHARD_MAX_INFLIGHT = int(os.getenv("SHARD_MAX_INFLIGHT", "4"))
+
+
+def shard_index(point_id, n_shards: int) -> int:
+    """Stable hash partitioning (process-independent, unlike ``hash()``)."""
+    digest = hashlib.blake2b(str(point_id).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % n_shards
+
+
+class ShardedVectorStore:
+    """
+    Hash-partitions points over several ``QdrantVectorStore`` shards behind the same interface.
+    Queries fan out to every shard concurrently and the per-shard top-k lists are merged by score;
+    shards that fail or miss the timeout are left out, so callers get partial results rather than
+    an error (only when no shard answers does ``query`` raise).
+    """
+
+    def __init__(self, shards: Sequence[QdrantVectorStore], timeout: float = SHARD_QUERY_TIMEOUT_S,
+                 max_inflight: int = SHARD_MAX_INFLIGHT):
+        if not shards:
+            raise ValueError("ShardedVectorStore needs at least one shard")
+        self.shards = list(shards)
+        self.collection = self.shards[0].collection
+        self.timeout = timeout
+        # Timed-out queries keep running until Qdrant gives up; capping them per shard keeps a slow
+        # shard's stragglers from filling the pool, and the extra workers leave room for writes
+        self._inflight = [threading.BoundedSemaphore(max_inflight) for _ in self.shards]
+        self._executor = ThreadPoolExecutor(max_workers=(max_inflight + 1) * len(self.shards),
+                                            thread_name_prefix="shard")
+        self._lock = threading.Lock()
+        self.latency = [LatencyWindow() for _ in self.shards]
+        self.counters = {"queries": 0, "partial": 0, "shard_timeouts": 0, "shard_errors": 0, "shard_saturated": 0}
+
+    @classmethod
+    def from_urls(cls, urls: Sequence[str], collection: str = COLLECTION_NAME, **kwargs) -> "ShardedVectorStore":
+        return cls([QdrantVectorStore(url=u.strip(), collection=collection) for u in urls if u.strip()], **kwargs)
+
+    def _incr(self, key: str, n: int = 1):
+        with self._lock:
+            self.counters[key] += n
+
+    def _fan_out(self, fn, targets=None) -> List[Any]:
+        """
+        Run ``fn`` concurrently on each of ``targets`` (default: every shard); any failure
+        propagates, since writes must not be silently partial.
+        """
+        targets = self.shards if targets is None else targets
+        futures = [self._executor.submit(contextvars.copy_context().run, fn, t) for t in targets]
+        return [f.result() for f in futures]
+
+    def _partition(self, ids) -> Dict[int, List[int]]:
+        groups = defaultdict(list)
+        for i, _id in enumerate(ids):
+            groups[shard_index(_id, len(self.shards))].append(i)
+        return groups
+
+    # --- reads ---
+
+    def _timed_query(self, idx: int, embedding, top_k: int, timeout: float):
+        try:
+            start = time.monotonic()
+            hits = self.shards[idx].query(embedding, top_k=top_k, timeout=timeout)
+            self.latency[idx].observe(time.monotonic() - start)
+            return hits
+        finally:
+            self._inflight[idx].release()
+
+    def query(self, embedding, top_k=5, timeout: Optional[float] = None):
+        """Scatter to all shards, gather within ``timeout`` (capped by the straggler budget), merge top-k."""
+        budget = self.timeout if timeout is None else min(timeout, self.timeout)
+        self._incr("queries")
+        futures = {}
+        for idx in range(len(self.shards)):
+            if not self._inflight[idx].acquire(blocking=False):
+                self._incr("shard_saturated")
+                continue
+            fut = self._executor.submit(contextvars.copy_context().run, self._timed_query, idx, embedding, top_k, budget)
+            futures[fut] = idx
+        if not futures:
+            raise TimeoutError("Every vector shard is saturated with in-flight queries")
+        done, pending = wait(futures, timeout=budget)
+        hits, answered, last_exc = [], 0, None
+        for fut in done:
+            try:
+                hits.extend(fut.result())
+                answered += 1
+            except Exception as e:
+                last_exc = e
+                self._incr("shard_errors")
+                logger.warning("Shard %d query failed: %s", futures[fut], e)
+        if pending:
+            self._incr("shard_timeouts", len(pending))
+            logger.warning("Shards %s missed the %.2fs budget", sorted(futures[f] for f in pending), budget)
+        if answered == 0:
+            if last_exc is not None:
+                raise last_exc
+            raise TimeoutError(f"No vector shard answered within {budget:.2f}s")
+        if answered < len(self.shards):
+            self._incr("partial")
+        return heapq.nlargest(top_k, hits, key=lambda h: h.score if h.score is not None else float("-inf"))
+
+    # --- writes ---
+
+    def upsert(self, ids, embeddings, metadatas, payloads=None, collection: Optional[str] = None):
+        ids, embeddings, metadatas = list(ids), list(embeddings), list(metadatas)
+        groups = self._partition(ids)
+
+        def write(idx):
+            rows = groups[idx]
+            self.shards[idx].upsert([ids[i] for i in rows], [embeddings[i] for i in rows],
+                                    [metadatas[i] for i in rows], collection=collection)
+
+        self._fan_out(write, list(groups))
+
+    def delete(self, ids, collection: Optional[str] = None):
+        ids = list(ids)
+        groups = self._partition(ids)
+        self._fan_out(lambda idx: self.shards[idx].delete([ids[i] for i in groups[idx]], collection=collection),
+                      list(groups))
+
+    def set_payload(self, point_id, payload: Dict[str, Any], collection: Optional[str] = None):
+        self.shards[shard_index(point_id, len(self.shards))].set_payload(point_id, payload, collection=collection)
+
+    # --- versioned collections: applied to every shard under the same name ---
+
+    def alias_target(self) -> Optional[str]:
+        targets = self._fan_out(lambda shard: shard.alias_target())
+        if len(set(targets)) > 1:
+            logger.warning("Shards disagree on alias %s: %s", self.collection, targets)
+        return targets[0]
+
+    def list_versions(self) -> List[str]:
+        return self.shards[0].list_versions()
+
+    def create_versioned_collection(self, vector_size: int = 768, name: Optional[str] = None) -> str:
+        name = self.shards[0].create_versioned_collection(vector_size, name)
+        self._fan_out(lambda shard: shard.create_versioned_collection(vector_size, name), self.shards[1:])
+        return name
+
+    def swap_alias(self, target: str, keep: int = 1):
+        # Each shard's swap is atomic; the shards flip within one fan-out of each other
+        self._fan_out(lambda shard: shard.swap_alias(target, keep))
+
+    def drop_collection(self, name: str):
+        self._fan_out(lambda shard: shard.client.collection_exists(name) and shard.drop_collection(name))
+
+    def manifest(self, collection: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        merged = {}
+        for part in self._fan_out(lambda shard: shard.manifest(collection)):
+            for source, entry in part.items():
+                if source not in merged or merged[source].get("alias"):
+                    merged[source] = entry
+        return merged
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        return dict(counters, shards=len(self.shards), latency=[w.summary() for w in self.latency])
@@ -1,22 +1,35 @@
 import os
+import math
+import time
 import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from qdrant_client import QdrantClient
 from qdrant_client.http import models as qmodels
-from typing import Optional
+from typing import Optional, List, Dict, Any
 from sentence_transformers import SentenceTransformer
 
 logger = logging.getLogger(__name__)
 
 QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
-COLLECTION_NAME = os.getenv("QDRANT_COLLECTION", "agentturing_math")
+# Name queries use; normally an alias pointing at the newest versioned collection
+COLLECTION_NAME = os.getenv("QDRANT_COLLECTION", "knowledge_base")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-mpnet-base-v2")  # fallback
+# Threads running deadline-bounded queries (a stalled call holds one until the HTTP client gives up)
+QDRANT_QUERY_WORKERS = int(os.getenv("QDRANT_QUERY_WORKERS", "8"))
 
 
 class QdrantVectorStore:
-    def __init__(self, url: str = QDRANT_URL, api_key: Optional[str] = None, collection: str = COLLECTION_NAME):
-        logger.info("Connecting to Qdrant at %s", url)
-        self.client = QdrantClient(url=url, api_key=api_key)
-        self.collection = "knowledge_base"
+    def __init__(self, url: str = QDRANT_URL, api_key: Optional[str] = None, collection: str = COLLECTION_NAME,
+                 location: Optional[str] = None):
+        if location is not None:
+            # e.g. ":memory:" for an embedded local instance
+            self.client = QdrantClient(location=location)
+        else:
+            logger.info("Connecting to Qdrant at %s", url)
+            self.client = QdrantClient(url=url, api_key=api_key)
+        self.collection = collection
+        self._executor = ThreadPoolExecutor(max_workers=QDRANT_QUERY_WORKERS, thread_name_prefix="qdrant-query")
 
     def _ensure_collection(self, vector_size: int = 768):
         """Ensure the collection exists, create if missing."""
@@ -39,7 +52,79 @@ class QdrantVectorStore:
         )
     
 
-    def upsert(self, ids, embeddings, metadatas, payloads=None):
+    # --- versioned collections behind an alias ---
+
+    def alias_target(self) -> Optional[str]:
+        """Collection the alias currently points at, or None if ``self.collection`` is not an alias."""
+        for alias in self.client.get_aliases().aliases:
+            if alias.alias_name == self.collection:
+                return alias.collection_name
+        return None
+
+    def list_versions(self) -> List[str]:
+        prefix = f"{self.collection}_v"
+        names = [c.name for c in self.client.get_collections().collections]
+        return sorted(n for n in names if n.startswith(prefix) and n[len(prefix):].isdigit())
+
+    def create_versioned_collection(self, vector_size: int = 768, name: Optional[str] = None) -> str:
+        """Create an empty ``<alias>_v<ms>`` collection to build into while the alias keeps serving."""
+        if name is None:
+            name = f"{self.collection}_v{int(time.time() * 1000)}"
+            while self.client.collection_exists(name):
+                name = f"{self.collection}_v{int(name.rsplit('_v', 1)[1]) + 1}"
+        logger.info("Creating versioned collection %s with vector size %d", name, vector_size)
+        self.client.create_collection(
+            collection_name=name,
+            vectors_config=qmodels.VectorParams(size=vector_size, distance=qmodels.Distance.COSINE),
+        )
+        return name
+
+    def swap_alias(self, target: str, keep: int = 1):
+        """
+        Atomically repoint the alias at ``target`` and drop all but ``keep`` previous versions.
+        A concrete collection still using the alias name (pre-alias layout) is migrated by
+        deleting it first; that one-time swap is not atomic.
+        """
+        ops = []
+        if self.alias_target() is not None:
+            ops.append(qmodels.DeleteAliasOperation(delete_alias=qmodels.DeleteAlias(alias_name=self.collection)))
+        elif self.client.collection_exists(self.collection):
+            logger.warning("Migrating concrete collection %s to an alias of %s", self.collection, target)
+            self.client.delete_collection(self.collection)
+        ops.append(qmodels.CreateAliasOperation(
+            create_alias=qmodels.CreateAlias(collection_name=target, alias_name=self.collection)))
+        self.client.update_collection_aliases(change_aliases_operations=ops)
+        logger.info("Alias %s now points at %s", self.collection, target)
+
+        older = [n for n in self.list_versions() if n < target]
+        for name in older[:max(0, len(older) - keep)]:
+            logger.info("Dropping old version %s", name)
+            self.client.delete_collection(name)
+
+    def drop_collection(self, name: str):
+        self.client.delete_collection(name)
+
+    def manifest(self, collection: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        source -> {"id", "hash"} for every point, read from payloads (no vectors). Sources merged
+        into another point as near-duplicates map to that point with ``"alias": True``.
+        """
+        out, merged, offset = {}, {}, None
+        while True:
+            points, offset = self.client.scroll(collection_name=collection or self.collection, limit=256,
+                                                offset=offset, with_payload=["source", "hash", "also_in"],
+                                                with_vectors=False)
+            for p in points:
+                payload = p.payload or {}
+                if payload.get("source") is not None:
+                    out[payload["source"]] = {"id": p.id, "hash": payload.get("hash")}
+                for source, digest in (payload.get("also_in") or {}).items():
+                    merged[source] = {"id": p.id, "hash": digest, "alias": True}
+            if offset is None:
+                # A source with its own point wins over a stale near-duplicate entry
+                return {**merged, **out}
+
+    def upsert(self, ids, embeddings, metadatas, payloads=None, collection: Optional[str] = None):
         from qdrant_client.http.models import PointStruct
         points = []
         for _id, emb, meta in zip(ids, embeddings, metadatas):
@@ -47,10 +132,45 @@ class QdrantVectorStore:
             if isinstance(_id, str) and _id.isdigit():
                 _id = int(_id)
             points.append(PointStruct(id=_id, vector=emb, payload=meta))
-        self.client.upsert(collection_name=self.collection, points=points)
+        self.client.upsert(collection_name=collection or self.collection, points=points)
+
+    def delete(self, ids, collection: Optional[str] = None):
+        self.client.delete(collection_name=collection or self.collection,
+                           points_selector=qmodels.PointIdsList(points=list(ids)))
+
+    def set_payload(self, point_id, payload: Dict[str, Any], collection: Optional[str] = None):
+        """Overwrite the given payload keys of one point (other keys and the vector are untouched)."""
+        self.client.set_payload(collection_name=collection or self.collection, payload=payload, points=[point_id])
 
 
-    def query(self, embedding, top_k=5):
-        """Search for the most similar vectors."""
-        res = self.client.search(collection_name=self.collection, query_vector=embedding, limit=top_k)
+    def query(self, embedding, top_k=5, timeout: Optional[float] = None):
+        """
+        Search for the most similar vectors. ``timeout`` (seconds) bounds the whole call, including
+        a stalled connection: past it the call is abandoned and TimeoutError is raised.
+        """
+        if timeout is None:
+            return self._search(embedding, top_k, None)
+        fut = self._executor.submit(contextvars.copy_context().run, self._search, embedding, top_k, timeout)
+        try:
+            return fut.result(timeout=timeout)
+        except FutureTimeout:
+            fut.cancel()
+            raise TimeoutError(f"Qdrant query on {self.collection} exceeded {timeout:.2f}s")
+
+    def _search(self, embedding, top_k: int, timeout: Optional[float]):
+        # Qdrant's server-side timeout is whole seconds; the client-side wait in query() is the exact bound
+        kwargs = {"timeout": max(1, math.ceil(timeout))} if timeout is not None else {}
+        if not hasattr(self.client, "search"):
+            # qdrant-client >= 1.13 dropped search() in favour of query_points()
+            return self.client.query_points(collection_name=self.collection, query=embedding,
+                                            limit=top_k, **kwargs).points
+        res = self.client.search(collection_name=self.collection, query_vector=embedding, limit=top_k, **kwargs)
         return res
+
+
+def make_vector_store(collection: str = COLLECTION_NAME):
+    """Single QdrantVectorStore, or a ShardedVectorStore when QDRANT_SHARDS lists several endpoints."""
+    from agentturing.database.sharded_store import QDRANT_SHARDS, ShardedVectorStore
+    if QDRANT_SHARDS:
+        return ShardedVectorStore.from_urls(QDRANT_SHARDS.split(","), collection=collection)
+    return QdrantVectorStore(collection=collection)
@@ -0,0 +1,136 @@
+import os
+import time
+import logging
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Optional
+
+from agentturing.guardrails.prefilter import prefilter, PASS, BLOCK
+from agentturing.guardrails.setup import make_input_guard, make_output_guard
+from agentturing.utils.metrics import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+GUARD_TIMEOUT_S = float(os.getenv("GUARD_TIMEOUT_S", "5"))
+GUARD_WORKERS = int(os.getenv("GUARD_WORKERS", "4"))
+# When the input guard times out or breaks: refuse (default) or, with 1, let the question through
+GUARD_FAIL_OPEN = os.getenv("GUARD_FAIL_OPEN", "0") == "1"
+REFUSAL = "I can only help with math questions."
+
+
+class Verdict:
+    def __init__(self, allowed: bool, stage: str, reason: str = ""):
+        self.allowed = allowed
+        self.stage = stage  # prefilter | guard | unguarded | timeout | error
+        self.reason = reason
+
+
+def _passed(outcome) -> bool:
+    return bool(getattr(outcome, "validation_passed", True))
+
+
+class GuardrailPolicy:
+    """
+    Input/output guardrails around the pipeline. ``start_input`` screens the question with the
+    local prefilter and, only if that is inconclusive, runs the (cached) guardrails validators on a
+    worker thread so they overlap embedding and retrieval; ``join_input`` collects the verdict
+    before anything leaves the process (MCP search or the LLM).
+    """
+
+    def __init__(self, input_guard_factory: Callable = make_input_guard,
+                 output_guard_factory: Callable = make_output_guard, timeout: float = GUARD_TIMEOUT_S,
+                 fail_open: bool = GUARD_FAIL_OPEN):
+        self.input_guard = input_guard_factory()
+        self.output_guard = output_guard_factory()
+        self.timeout = timeout
+        self.fail_open = fail_open
+        self._executor = ThreadPoolExecutor(max_workers=GUARD_WORKERS, thread_name_prefix="guard")
+        self._lock = threading.Lock()
+        self.latency = {name: LatencyWindow() for name in ("prefilter", "input_guard", "input_wait", "output_guard")}
+        self.counters = {"prefilter_pass": 0, "prefilter_block": 0, "guard_checks": 0, "guard_blocks": 0,
+                         "unguarded": 0, "timeouts": 0, "errors": 0, "output_checks": 0, "output_blocks": 0}
+
+    def _incr(self, key: str):
+        with self._lock:
+            self.counters[key] += 1
+
+    def start_input(self, question: str) -> Future:
+        """Return a future of the input Verdict; already resolved unless the heavy guard is needed."""
+        start = time.perf_counter()
+        decision = prefilter(question)
+        self.latency["prefilter"].observe(time.perf_counter() - start)
+        done = Future()
+        if decision == PASS:
+            self._incr("prefilter_pass")
+            done.set_result(Verdict(True, "prefilter"))
+        elif decision == BLOCK:
+            self._incr("prefilter_block")
+            done.set_result(Verdict(False, "prefilter", "blocked by prefilter"))
+        elif self.input_guard is None:
+            self._incr("unguarded")
+            done.set_result(Verdict(True, "unguarded"))
+        else:
+            return self._executor.submit(contextvars.copy_context().run, self._validate_input, question)
+        return done
+
+    def _validate_input(self, question: str) -> Verdict:
+        self._incr("guard_checks")
+        start = time.perf_counter()
+        try:
+            outcome = self.input_guard.validate(question)
+        except Exception as e:
+            # on_fail="exception" validators raise; treat as a block rather than letting input through
+            self._incr("guard_blocks")
+            return Verdict(False, "guard", str(e))
+        finally:
+            self.latency["input_guard"].observe(time.perf_counter() - start)
+        if not _passed(outcome):
+            self._incr("guard_blocks")
+            return Verdict(False, "guard", "failed input validation")
+        return Verdict(True, "guard")
+
+    def join_input(self, pending: Future, timeout: Optional[float] = None) -> Verdict:
+        """
+        Wait for the input verdict; the wait is the guard's only added latency on the request path.
+        Only inputs the prefilter could not clear get here, so a guard that times out (including
+        when the request deadline is nearly spent) or breaks refuses them unless ``fail_open``.
+        """
+        start = time.perf_counter()
+        try:
+            return pending.result(timeout=self.timeout if timeout is None else timeout)
+        except FutureTimeout:
+            self._incr("timeouts")
+            logger.warning("Input guard timed out; %s request", "allowing" if self.fail_open else "refusing")
+            return Verdict(self.fail_open, "timeout", "input guard timed out")
+        except Exception as e:
+            self._incr("errors")
+            logger.warning("Input guard failed; %s request: %s", "allowing" if self.fail_open else "refusing", e)
+            return Verdict(self.fail_open, "error", str(e))
+        finally:
+            self.latency["input_wait"].observe(time.perf_counter() - start)
+
+    def check_output(self, answer: str) -> str:
+        """Validate the answer with the output guard (if configured); returns the text to send."""
+        if self.output_guard is None:
+            return answer
+        self._incr("output_checks")
+        start = time.perf_counter()
+        try:
+            outcome = self.output_guard.validate(answer)
+        except Exception as e:
+            self._incr("output_blocks")
+            logger.warning("Output guard rejected answer: %s", e)
+            return REFUSAL
+        finally:
+            self.latency["output_guard"].observe(time.perf_counter() - start)
+        if not _passed(outcome):
+            self._incr("output_blocks")
+            return REFUSAL
+        return getattr(outcome, "validated_output", None) or answer
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        return dict(counters, input_guard=self.input_guard is not None, output_guard=self.output_guard is not None,
+                    latency={name: window.summary() for name, window in self.latency.items()})
@@ -0,0 +1,51 @@
+import os
+import re
+from agentturing.utils.sanitize import contains_pii
+
+# Verdicts: PASS skips the heavy validators, BLOCK refuses outright, CHECK defers to the guard
+PASS, BLOCK, CHECK = "pass", "block", "check"
+
+GUARD_MAX_INPUT_CHARS = int(os.getenv("GUARD_MAX_INPUT_CHARS", "2000"))
+# Only short inputs can be waved through; anything longer gets the full validators
+PREFILTER_SAFE_MAX_CHARS = int(os.getenv("PREFILTER_SAFE_MAX_CHARS", "300"))
+
+_INJECTION = re.compile(
+    r"ignore\s+(all\s+|any\s+)?(the\s+)?(previous|prior|above)\s+(instructions|prompts?)"
+    r"|disregard\s+(the\s+|your\s+)?(system|previous|prior)"
+    r"|reveal\s+(the\s+|your\s+)?system\s+prompt|jailbreak|developer\s+mode",
+    re.IGNORECASE,
+)
+# An operator with an operand on each side ("2x + 5 = 11", "x² - 1", "7 * 8", "f(x)=x^2")
+_EXPRESSION = re.compile(r"[\w)\]²³π!]\s*[=+\-*/^%<>≤≥≠±×÷]\s*[\w(\[√π-]")
+# Every multi-letter word must come from this vocabulary for a question to skip the validators:
+# a number or keyword next to arbitrary prose ("list 5 steps", "3 paragraphs") is not enough
+_MATH_WORDS = frozenset("""
+    solve simplify integrate integral derivative derivatives differentiate factor factorise factorize
+    prove evaluate compute calculate find determine expand collect rearrange round convert compare sort
+    equation equations expression inequality limit matrix probability sum product root roots square cube
+    area volume angle triangle circle radius diameter fraction fractions percent percentage log ln sin cos
+    tan sec csc cot exp sqrt polynomial function graph mean median mode average value values variable
+    number numbers integer integers prime primes factors multiple multiples remainder divisor divisors
+    gcd lcm base digit digits decimal place nearest term terms sequence next nth first second third
+    coefficient degree quotient total difference ratio rate speed distance time minutes hours seconds
+    plus minus times divided multiplied over by than less greater equal equals respect
+    let what which is are be the of a an to for in and or if then with from at as its on
+    when where how many much does do whether true false give get
+""".split())
+_WORD = re.compile(r"[^\W\d_¹²³]{2,}")  # letters only (superscripts are \w but not \d)
+_SAFE_CHARS = re.compile(r"^[\w\s.,;:!?'\"()\[\]{}=+\-*/^%<>|√π∫∑∞≤≥≠±×÷°²³·]+$")
+_RISKY = re.compile(r"https?://|www\.|<\s*/?\s*[a-z]+[^>]*>|```|\\x[0-9a-f]{2}", re.IGNORECASE)
+
+
+def prefilter(text: str) -> str:
+    """
+    Cheap local screen for a question: PASS only short inputs with a real expression and nothing but
+    math vocabulary around it, BLOCK obvious abuse, else CHECK.
+    """
+    if len(text) > GUARD_MAX_INPUT_CHARS or _INJECTION.search(text):
+        return BLOCK
+    if (len(text) <= PREFILTER_SAFE_MAX_CHARS and _SAFE_CHARS.match(text) and _EXPRESSION.search(text)
+            and all(w.lower() in _MATH_WORDS for w in _WORD.findall(text))
+            and not _RISKY.search(text) and not contains_pii(text)):
+        return PASS
+    return CHECK
@@ -1,15 +1,46 @@
 import logging
-from guardrails import Guard
 import os
+import threading
 
 logger = logging.getLogger(__name__)
 GUARDRAILS_CONFIG = os.getenv("GUARDRAILS_CONFIG", "agentturing/guardrails/policies/math_guardrails.yml")
+# Answer validators need their own config (the input one checks injection/topic, not answers);
+# unset means no output guard
+GUARDRAILS_OUTPUT_CONFIG = os.getenv("GUARDRAILS_OUTPUT_CONFIG", "")
 
-def make_input_guard():
+_guards = {}
+_lock = threading.Lock()
+
+
+def _load_guard(path: str):
     # Example: uses guardrails yaml config
+    if not path or not os.path.exists(path):
+        logger.info("Guardrails config %s not found; heavy validators disabled", path)
+        return None
     try:
-        guard = Guard.from_path(GUARDRAILS_CONFIG)
+        from guardrails import Guard
+        guard = Guard.from_path(path)
         return guard
     except Exception as e:
         logger.exception("Failed to load guardrails config: %s", e)
         return None
+
+
+def _cached(kind: str, path: str):
+    """Build each guard once per process; validators are compiled on load, not per request."""
+    key = (kind, path)
+    if key not in _guards:
+        with _lock:
+            if key not in _guards:
+                _guards[key] = _load_guard(path)
+    return _guards[key]
+
+
+def make_input_guard():
+    return _cached("input", GUARDRAILS_CONFIG)
+
+
+def make_output_guard():
+    if not GUARDRAILS_OUTPUT_CONFIG:
+        return None
+    return _cached("output", GUARDRAILS_OUTPUT_CONFIG)
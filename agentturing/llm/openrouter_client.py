@@ -3,6 +3,7 @@ import os
 import logging
 from typing import Optional, Dict, Any
 import asyncio
+from agentturing.llm.scheduler import get_scheduler, parse_duration
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +15,8 @@ class OpenRouterClient:
         
         if not self.api_key:
             raise ValueError("OpenRouter API key is required. Get a free one at https://openrouter.ai/")
+        # Shared with LLM so both clients draw on the same OpenRouter budget
+        self.scheduler = get_scheduler("openrouter")
     
     async def generate_async(self, prompt: str, max_tokens: int = 1000, temperature: float = 0.7) -> str:
         """Generate text using OpenRouter API (async)"""
@@ -31,15 +34,25 @@ class OpenRouterClient:
             "temperature": temperature
         }
         
+        reserved = len(prompt) // 4 + max_tokens
         try:
+            if self.scheduler is not None:
+                await self.scheduler.acquire_async(reserved, timeout=30.0)
             async with httpx.AsyncClient(timeout=30.0) as client:
                 response = await client.post(
                     f"{self.base_url}/chat/completions",
                     headers=headers,
                     json=data
                 )
+                if self.scheduler is not None:
+                    self.scheduler.update_from_headers(response.headers)
+                    if response.status_code == 429:
+                        retry_after = response.headers.get("Retry-After")
+                        self.scheduler.on_rate_limited(parse_duration(retry_after) if retry_after else None)
                 response.raise_for_status()
                 result = response.json()
+                if self.scheduler is not None:
+                    self.scheduler.settle(reserved, result.get("usage", {}).get("total_tokens"))
                 return result["choices"][0]["message"]["content"].strip()
         except httpx.HTTPStatusError as e:
             logger.error(f"OpenRouter HTTP error: {e.response.status_code} - {e.response.text}")
@@ -72,7 +85,7 @@ import logging
 from typing import Dict, Any, List
 from agentturing.llm.openrouter_client import OpenRouterClient
 from sentence_transformers import SentenceTransformer
-from agentturing.database.vectorstore import QdrantVectorStore
+from agentturing.database.vectorstore import make_vector_store
 
 logger = logging.getLogger(__name__)
 
@@ -91,7 +104,7 @@ class AgentPipeline:
         
         # Vector store (will create empty collection if not exists)
         try:
-            self.vector_store = QdrantVectorStore(collection="math_kb")
+            self.vector_store = make_vector_store()
         except Exception as e:
             logger.warning(f"Vector store not available: {e}")
             self.vector_store = None
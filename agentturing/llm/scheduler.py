@@ -0,0 +1,249 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, Mapping, Optional
+
+from agentturing.utils import metrics
+from agentturing.utils.metrics import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+# provider=requests_per_minute:tokens_per_minute (0 = no token budget)
+LLM_RATE_LIMITS = os.getenv("LLM_RATE_LIMITS", "openrouter=20:0,gemini=15:1000000")
+LLM_SCHEDULER_MAX_QUEUE = int(os.getenv("LLM_SCHEDULER_MAX_QUEUE", "100"))
+# Used when a 429 carries no Retry-After
+DEFAULT_RETRY_AFTER_S = 10.0
+
+
+class RateLimited(Exception):
+    """The provider's local queue is full or the caller's timeout ran out while waiting for budget."""
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Parse '1.5', '200ms', '6m0s', '1h2m' or an epoch timestamp (s or ms) into seconds from now."""
+    value = value.strip()
+    try:
+        number = float(value)
+    except ValueError:
+        total, num = 0.0, ""
+        units = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+        i = 0
+        while i < len(value):
+            ch = value[i]
+            if ch.isdigit() or ch == ".":
+                num += ch
+                i += 1
+                continue
+            unit = "ms" if value[i:i + 2] == "ms" else ch
+            if unit not in units or not num:
+                return None
+            total += float(num) * units[unit]
+            num = ""
+            i += len(unit)
+        return total if not num else None
+    if number > 1e12:  # epoch milliseconds (OpenRouter X-RateLimit-Reset)
+        return max(0.0, number / 1000.0 - time.time())
+    if number > 1e9:  # epoch seconds
+        return max(0.0, number - time.time())
+    return number
+
+
+class TokenBucket:
+    """Classic token bucket: ``capacity`` tokens refilled at ``rate`` tokens per second."""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.level = capacity
+        self._last = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._last) * self.rate)
+        self._last = now
+
+    def time_until(self, amount: float) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate if self.rate > 0 else float("inf")
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def give(self, amount: float):
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+class ProviderScheduler:
+    """
+    Shared FIFO scheduler for one provider. Callers block in ``acquire`` until both the request
+    and token budgets allow them through, so bursts are smoothed instead of failing with 429s.
+    Limits adapt to the provider's rate-limit headers.
+    """
+
+    def __init__(self, name: str, rpm: float, tpm: float = 0, max_queue: int = LLM_SCHEDULER_MAX_QUEUE):
+        self.name = name
+        self.requests = TokenBucket(rpm, rpm / 60.0)
+        self.tokens = TokenBucket(tpm, tpm / 60.0) if tpm else None
+        self.max_queue = max_queue
+        self.paused_until = 0.0
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self.wait = LatencyWindow()
+        self.counters = {"granted": 0, "rejected": 0, "cancelled": 0, "rate_limited": 0, "header_updates": 0}
+
+    def acquire(self, tokens: int = 0, timeout: Optional[float] = None,
+                cancel: Optional[threading.Event] = None) -> float:
+        """
+        Block until a request costing ``tokens`` may be sent; returns seconds waited. Setting
+        ``cancel`` (and notifying the scheduler, see ``acquire_async``) gives up the queue slot.
+        """
+        start = time.monotonic()
+        ticket = object()
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self.counters["rejected"] += 1
+                raise RateLimited(f"{self.name} scheduler queue full ({self.max_queue})")
+            self._queue.append(ticket)
+            try:
+                while True:
+                    if cancel is not None and cancel.is_set():
+                        self.counters["cancelled"] += 1
+                        raise RateLimited(f"{self.name} wait cancelled")
+                    delay = self._delay(tokens) if self._queue[0] is ticket else None
+                    if delay == 0.0:
+                        break
+                    left = None if timeout is None else timeout - (time.monotonic() - start)
+                    if left is not None and (left <= 0 or (delay is not None and delay > left)):
+                        self.counters["rejected"] += 1
+                        raise RateLimited(f"{self.name} rate budget not available within {timeout:.1f}s")
+                    waits = [w for w in (delay, left) if w is not None]
+                    self._cond.wait(min(waits) if waits else None)
+            except BaseException:
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+                raise
+            self._queue.popleft()
+            self.requests.take(1)
+            if self.tokens is not None and tokens:
+                self.tokens.take(tokens)
+            self.counters["granted"] += 1
+            self._cond.notify_all()
+        waited = time.monotonic() - start
+        self.wait.observe(waited)
+        return waited
+
+    async def acquire_async(self, tokens: int = 0, timeout: Optional[float] = None) -> float:
+        cancel = threading.Event()
+        try:
+            return await asyncio.to_thread(self.acquire, tokens, timeout, cancel)
+        except asyncio.CancelledError:
+            # Wake the waiting thread so its ticket leaves the queue instead of blocking those behind it
+            cancel.set()
+            with self._cond:
+                self._cond.notify_all()
+            raise
+
+    def _delay(self, tokens: int) -> float:
+        delay = max(0.0, self.paused_until - time.monotonic(), self.requests.time_until(1))
+        if self.tokens is not None and tokens:
+            delay = max(delay, self.tokens.time_until(tokens))
+        return delay
+
+    def settle(self, reserved: int, actual: Optional[int]):
+        """Refund the difference when a call used fewer tokens than reserved."""
+        if self.tokens is None or actual is None or actual >= reserved:
+            return
+        with self._cond:
+            self.tokens.give(reserved - actual)
+            self._cond.notify_all()
+
+    def on_rate_limited(self, retry_after: Optional[float] = None):
+        """Provider answered 429: hold the whole queue until it says we may retry."""
+        with self._cond:
+            self.counters["rate_limited"] += 1
+            pause = retry_after if retry_after is not None else DEFAULT_RETRY_AFTER_S
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+            logger.warning("%s rate limited, pausing %.1fs", self.name, pause)
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """Adapt budgets from OpenAI-style x-ratelimit-*-requests/-tokens or OpenRouter X-RateLimit-* headers."""
+        h = {k.lower(): v for k, v in headers.items()}
+        with self._cond:
+            updated = False
+            for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+                suffix = f"-{kind}" if f"x-ratelimit-limit-{kind}" in h else ("" if kind == "requests" else None)
+                if suffix is None or bucket is None:
+                    continue
+                limit = h.get(f"x-ratelimit-limit{suffix}")
+                remaining = h.get(f"x-ratelimit-remaining{suffix}")
+                reset = h.get(f"x-ratelimit-reset{suffix}")
+                try:
+                    if limit is not None and float(limit) > 0 and float(limit) != bucket.capacity:
+                        bucket.capacity = float(limit)
+                        bucket.rate = bucket.capacity / 60.0
+                        updated = True
+                    if remaining is not None:
+                        bucket._refill()
+                        bucket.level = min(bucket.level, float(remaining))
+                        updated = True
+                        wait = parse_duration(reset) if reset else None
+                        if float(remaining) <= 0 and wait:
+                            self.paused_until = max(self.paused_until, time.monotonic() + wait)
+                except ValueError:
+                    logger.debug("Ignoring malformed rate-limit headers from %s: %s", self.name, h)
+            retry_after = h.get("retry-after")
+            if retry_after:
+                wait = parse_duration(retry_after)
+                if wait:
+                    self.paused_until = max(self.paused_until, time.monotonic() + wait)
+                    updated = True
+            if updated:
+                self.counters["header_updates"] += 1
+                self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return dict(
+                self.counters,
+                queue_depth=len(self._queue),
+                rpm=self.requests.capacity,
+                tpm=self.tokens.capacity if self.tokens is not None else None,
+                paused_for_s=max(0.0, round(self.paused_until - time.monotonic(), 3)),
+                wait=self.wait.summary(),
+            )
+
+
+_schedulers: Dict[str, ProviderScheduler] = {}
+_lock = threading.Lock()
+
+
+def _configured_limits() -> Dict[str, tuple]:
+    limits = {}
+    for spec in LLM_RATE_LIMITS.split(","):
+        if "=" not in spec:
+            continue
+        name, sizes = spec.split("=")
+        rpm, _, tpm = sizes.partition(":")
+        limits[name.strip()] = (float(rpm), float(tpm or 0))
+    return limits
+
+
+def get_scheduler(provider: str) -> Optional[ProviderScheduler]:
+    """Process-wide scheduler for ``provider``, or None when it has no configured limits."""
+    with _lock:
+        if provider not in _schedulers:
+            limits = _configured_limits().get(provider)
+            if limits is None:
+                return None
+            _schedulers[provider] = ProviderScheduler(provider, *limits)
+            if len(_schedulers) == 1:
+                metrics.register("llm_scheduler", lambda: {n: s.stats() for n, s in _schedulers.items()})
+        return _schedulers[provider]
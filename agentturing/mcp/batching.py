@@ -0,0 +1,68 @@
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+async def run_blocking(executor: Executor, limit: asyncio.Semaphore, fn: Callable, *args) -> Any:
+    """Run ``fn`` on ``executor`` without blocking the loop; ``limit`` bounds queued work."""
+    async with limit:
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+class EncodeBatcher:
+    """
+    Coalesce concurrent ``encode`` calls into a single batched call run off the event loop.
+    A batch is flushed when it reaches ``max_batch`` texts or ``max_wait`` seconds after its first text.
+    """
+
+    def __init__(self, encode_batch: Callable[[List[str]], List[Any]], executor: Executor,
+                 limit: asyncio.Semaphore, max_batch: int = 32, max_wait: float = 0.005):
+        self.encode_batch = encode_batch
+        self.executor = executor
+        self.limit = limit
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # The loop only keeps weak references to tasks; hold running batches until they finish
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.texts = 0
+
+    async def encode(self, text: str) -> Any:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append((text, fut))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await fut
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]):
+        self.batches += 1
+        self.texts += len(batch)
+        try:
+            vectors = await run_blocking(self.executor, self.limit, self.encode_batch, [t for t, _ in batch])
+        except Exception as e:
+            logger.error("Batched encode of %d texts failed: %s", len(batch), e)
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for (_, fut), vec in zip(batch, vectors):
+            if not fut.done():
+                fut.set_result(vec)
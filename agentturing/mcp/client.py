@@ -1,25 +1,146 @@
 import os
+import time
 import logging
+import threading
+from typing import Optional
 import httpx
+from agentturing.utils import metrics
+from agentturing.utils.cache import TTLCache
+from agentturing.utils.cassette import Cassette, get_cassette
+from agentturing.utils.metrics import LatencyWindow
+from agentturing.utils.resilience import CircuitBreaker
 
 logger = logging.getLogger(__name__)
 
 MCP_URL = os.getenv("MCP_URL", "http://localhost:8001")
+MCP_CACHE_TTL = float(os.getenv("MCP_CACHE_TTL", "3600"))
+# Empty answers are cached briefly so a KB-miss storm does not hammer MCP
+MCP_EMPTY_CACHE_TTL = float(os.getenv("MCP_EMPTY_CACHE_TTL", "300"))
+MCP_CACHE_SIZE = int(os.getenv("MCP_CACHE_SIZE", "1024"))
+MCP_BREAKER_THRESHOLD = int(os.getenv("MCP_BREAKER_THRESHOLD", "3"))
+MCP_BREAKER_COOLDOWN = float(os.getenv("MCP_BREAKER_COOLDOWN", "60"))
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split()).rstrip("?.! ")
+
 
 class MCPClient:
-    def __init__(self, url: str = MCP_URL):
+    def __init__(self, url: str = MCP_URL, cassette: Optional[Cassette] = None):
         self.url = url
+        # Records or replays the HTTP search call (below the cache and breaker) when set
+        self.cassette = cassette if cassette is not None else get_cassette()
         self.client = httpx.Client(timeout=10.0)
+        self.cache = TTLCache(maxsize=MCP_CACHE_SIZE, ttl=MCP_CACHE_TTL)
+        # Empty results count as failures: a search backend that never finds anything is not worth the round trip
+        self.breaker = CircuitBreaker("mcp", MCP_BREAKER_THRESHOLD, MCP_BREAKER_COOLDOWN)
+        self.latency = LatencyWindow()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "skipped_open": 0, "failures": 0, "empty": 0,
+                         "deadline_timeouts": 0}
+        self.time_saved = 0.0
+        metrics.register("mcp_search", self.stats)
 
-    def web_search(self, query: str, top_k: int = 3) -> dict:
+    def web_search(self, query: str, top_k: int = 3, timeout: Optional[float] = None,
+                   timeout_capped: bool = False) -> dict:
         """
         Query MCP web search tool. Expects MCP server to respond with JSON:
         { "results": [{"title":"", "snippet":"", "url":""}, ...] }
+        Results are cached by normalized query; calls are skipped while the breaker is open.
+        ``timeout`` overrides the client default for this call (e.g. the request's remaining deadline);
+        pass ``timeout_capped=True`` when it was cut short by that deadline, so a timeout is charged
+        to the request rather than to the MCP backend's breaker.
+        """
+        key = (normalize_query(query), top_k)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._count("hits", saved=True)
+            return cached
+        self._count("misses")
+
+        if not self.breaker.allow():
+            self._count("skipped_open", saved=True)
+            return {"results": []}
+
+        start = time.perf_counter()
+        try:
+            if self.cassette is None:
+                data = self._search(query, top_k, timeout)
+            else:
+                data = self.cassette.intercept("mcp", {"query": key[0], "top_k": top_k},
+                                               lambda: self._search(query, top_k, timeout), max_wait=timeout)
+        except (httpx.TimeoutException, TimeoutError) as e:
+            if not timeout_capped:
+                return self._failed(e)
+            logger.warning("MCP web_search ran out of request deadline after %.2fs", timeout)
+            self.breaker.release_probe()
+            self._count("deadline_timeouts")
+            return {"results": []}
+        except Exception as e:
+            return self._failed(e)
+        finally:
+            self.latency.observe(time.perf_counter() - start)
+
+        if data.get("results"):
+            self.breaker.record_success()
+            self.cache.set(key, data)
+        else:
+            self.breaker.record_failure()
+            self._count("empty")
+            self.cache.set(key, data, ttl=MCP_EMPTY_CACHE_TTL)
+        return data
+
+    def _failed(self, e: Exception) -> dict:
+        logger.exception("MCP web_search failed: %s", e)
+        self.breaker.record_failure()
+        self._count("failures")
+        return {"results": []}
+
+    def _search(self, query: str, top_k: int, timeout: Optional[float]) -> dict:
+        kwargs = {"timeout": timeout} if timeout is not None else {}
+        resp = self.client.post(f"{self.url}/tools/websearch", json={"query": query, "top_k": top_k}, **kwargs)
+        resp.raise_for_status()
+        return resp.json()
+
+    def call_batch(self, calls: list) -> list:
         """
+        Send several tool calls to the MCP /rpc endpoint in one round trip.
+        calls: [("websearch", {"query": "...", "top_k": 3}), ("query", {"query": "..."}), ...]
+        Returns one result per call, in order; failed calls yield None.
+        """
+        payload = [
+            {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+            for i, (method, params) in enumerate(calls)
+        ]
         try:
-            resp = self.client.post(f"{self.url}/tools/websearch", json={"query": query, "top_k": top_k})
+            resp = self.client.post(f"{self.url}/rpc", json=payload)
             resp.raise_for_status()
-            return resp.json()
+            answers = {a.get("id"): a for a in resp.json()}
         except Exception as e:
-            logger.exception("MCP web_search failed: %s", e)
-            return {"results": []}
+            logger.exception("MCP batch call failed: %s", e)
+            return [None] * len(calls)
+        out = []
+        for i in range(len(calls)):
+            answer = answers.get(i, {})
+            if "error" in answer:
+                logger.warning("MCP batch call %s failed: %s", calls[i][0], answer["error"])
+            out.append(answer.get("result"))
+        return out
+
+    def _count(self, key: str, saved: bool = False):
+        with self._lock:
+            self.counters[key] += 1
+            if saved:
+                self.time_saved += self.latency.mean() or 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return dict(
+                self.counters,
+                hit_rate=self.counters["hits"] / lookups if lookups else 0.0,
+                breaker=self.breaker.state,
+                time_saved_s=round(self.time_saved, 3),
+                cache_size=len(self.cache),
+                latency=self.latency.summary(),
+            )
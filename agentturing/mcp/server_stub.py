@@ -1,8 +1,13 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
+from fastapi import FastAPI, Body
+from pydantic import BaseModel, ValidationError
+from typing import Any, Dict, List, Union
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import logging
-from sentence_transformers import SentenceTransformer
-from agentturing.database.vectorstore import QdrantVectorStore
+from agentturing.database.vectorstore import make_vector_store
+from agentturing.database.passage_store import payload_text
+from agentturing.model.embeddings import load_embedder
+from agentturing.mcp.batching import EncodeBatcher, run_blocking
 import httpx
 import os
 from dotenv import load_dotenv
@@ -17,8 +22,38 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Init embedding + Qdrant
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
-store = QdrantVectorStore(collection="math_kb")
+embedder = load_embedder("all-MiniLM-L6-v2")
+# Same collection alias (or shards) that ingestion swaps and the pipeline reads
+store = make_vector_store()
+
+# Blocking work (encode, Qdrant) runs on a bounded executor, never on the event loop
+MCP_EXECUTOR_WORKERS = int(os.getenv("MCP_EXECUTOR_WORKERS", "4"))
+MCP_MAX_INFLIGHT = int(os.getenv("MCP_MAX_INFLIGHT", "64"))
+MCP_ENCODE_BATCH = int(os.getenv("MCP_ENCODE_BATCH", "32"))
+MCP_ENCODE_WAIT_MS = float(os.getenv("MCP_ENCODE_WAIT_MS", "5"))
+executor = ThreadPoolExecutor(max_workers=MCP_EXECUTOR_WORKERS, thread_name_prefix="mcp-blocking")
+_inflight = None
+_batcher = None
+
+
+def _blocking_limit() -> asyncio.Semaphore:
+    global _inflight
+    if _inflight is None:
+        _inflight = asyncio.Semaphore(MCP_MAX_INFLIGHT)
+    return _inflight
+
+
+def _encode_batcher() -> EncodeBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = EncodeBatcher(
+            lambda texts: embedder.encode(texts).tolist(),
+            executor,
+            _blocking_limit(),
+            max_batch=MCP_ENCODE_BATCH,
+            max_wait=MCP_ENCODE_WAIT_MS / 1000.0,
+        )
+    return _batcher
 
 # OpenRouter configuration
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
@@ -75,24 +110,19 @@ async def call_openrouter(prompt: str, max_tokens: int = 1000):
         return f"I'm sorry, I encountered an error processing your math question. Please try again. (Error: {str(e)})"
 
 # -------------------------------------------------
-# Endpoints
+# Tool handlers
 # -------------------------------------------------
-@app.post("/tools/websearch")
-async def web_search(req: WebSearchRequest):
+async def _websearch(req: WebSearchRequest) -> Dict[str, Any]:
     logger.info("MCP stub received websearch: %s", req.query)
     return {"results": []}
 
-@app.post("/query")
-async def query_math(request: QueryRequest):
-    """
-    Query KB + generate reasoning with OpenRouter.
-    """
+async def _query(request: QueryRequest) -> Dict[str, Any]:
     try:
-        # Embed and retrieve
-        embedding = embedder.encode(request.query).tolist()
-        results = store.query(embedding, top_k=5)
+        # Embed (micro-batched with concurrent callers) and retrieve off the event loop
+        embedding = await _encode_batcher().encode(request.query)
+        results = await run_blocking(executor, _blocking_limit(), store.query, embedding, 5)
         matches = [
-            {"id": r.id, "score": r.score, "text": r.payload.get("text", "")}
+            {"id": r.id, "score": r.score, "text": payload_text(r.payload)}
             for r in results
         ]
 
@@ -132,6 +162,51 @@ Please provide a clear, step-by-step solution with explanations. Show your work
             "answer": f"I apologize, but I encountered an error while processing your question: {str(e)}. Please try again."
         }
 
+# JSON-RPC style method table for the batch endpoint
+RPC_METHODS = {
+    "websearch": (WebSearchRequest, _websearch),
+    "query": (QueryRequest, _query),
+}
+
+async def _dispatch(call: Any) -> Dict[str, Any]:
+    call_id = call.get("id") if isinstance(call, dict) else None
+    if not isinstance(call, dict) or call.get("method") not in RPC_METHODS:
+        return {"jsonrpc": "2.0", "id": call_id, "error": {"code": -32601, "message": "Method not found"}}
+    schema, handler = RPC_METHODS[call["method"]]
+    try:
+        params = schema(**(call.get("params") or {}))
+    except ValidationError as e:
+        return {"jsonrpc": "2.0", "id": call_id, "error": {"code": -32602, "message": str(e)}}
+    try:
+        return {"jsonrpc": "2.0", "id": call_id, "result": await handler(params)}
+    except Exception as e:
+        logger.error("RPC %s failed: %s", call["method"], e)
+        return {"jsonrpc": "2.0", "id": call_id, "error": {"code": -32603, "message": str(e)}}
+
+# -------------------------------------------------
+# Endpoints
+# -------------------------------------------------
+@app.post("/tools/websearch")
+async def web_search(req: WebSearchRequest):
+    return await _websearch(req)
+
+@app.post("/query")
+async def query_math(request: QueryRequest):
+    """
+    Query KB + generate reasoning with OpenRouter.
+    """
+    return await _query(request)
+
+@app.post("/rpc")
+async def rpc(payload: Union[List[Dict[str, Any]], Dict[str, Any]] = Body(...)):
+    """
+    JSON-RPC 2.0 style endpoint. A list of calls is answered concurrently, in order:
+    [{"jsonrpc": "2.0", "id": 1, "method": "websearch", "params": {"query": "..."}}, ...]
+    """
+    if isinstance(payload, list):
+        return await asyncio.gather(*(_dispatch(call) for call in payload))
+    return await _dispatch(payload)
+
 @app.get("/health")
 async def health():
     return {"status": "ok", "model": OPENROUTER_MODEL}
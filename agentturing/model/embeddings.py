@@ -1,7 +1,26 @@
-from langchain_huggingface import HuggingFaceEmbeddings
+import os
+import logging
 
 from agentturing.constants import EMBEDDING_MODEL_NAME
 
+logger = logging.getLogger(__name__)
+
+# torch (sentence-transformers), onnx (ONNX Runtime fp32) or onnx-int8 (dynamic int8 quantized)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+
 
 def get_embedder():
+    from langchain_huggingface import HuggingFaceEmbeddings
     return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+
+
+def load_embedder(model_name: str, backend: str = EMBEDDING_BACKEND):
+    """Return an encoder with the SentenceTransformer ``encode`` interface for the given backend."""
+    backend = backend.lower()
+    if backend in ("onnx", "onnx-int8"):
+        from agentturing.model.onnx_embedder import OnnxEmbedder
+        return OnnxEmbedder(model_name, quantize=backend == "onnx-int8")
+    if backend != "torch":
+        logger.warning("Unknown EMBEDDING_BACKEND %s, using torch", backend)
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
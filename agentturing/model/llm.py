@@ -1,7 +1,11 @@
 # agentturing/model/llm.py
 import os
 import logging
+from typing import Optional
 import requests
+from agentturing.llm.scheduler import get_scheduler, parse_duration
+from agentturing.utils import metrics
+from agentturing.utils.cassette import Cassette, get_cassette, CASSETTE_PATH
 
 logger = logging.getLogger(__name__)
 
@@ -9,22 +13,55 @@ LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
 LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "gemini-1.5-flash")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+# Optional HF tokenizer used to count tokens for API backends (no local tokenizer there)
+LLM_TOKENIZER = os.getenv("LLM_TOKENIZER")
+CHARS_PER_TOKEN = 4
+DEFAULT_TIMEOUT = 60
+
+
+def normalize_backend(backend: str) -> str:
+    backend = backend.strip().lower()
+    if backend == "openrouter" or "meta-llama" in backend:
+        return "openrouter"
+    if backend == "gemini":
+        return "gemini"
+    if backend == "replay":
+        return "replay"
+    return "transformers"
+
 
 class LLM:
-    def __init__(self):
-        if LLM_BACKEND == "gemini":
+    def __init__(self, backend: str = LLM_BACKEND, model_name: str = LLM_MODEL_NAME,
+                 cassette: Optional[Cassette] = None):
+        self.backend = normalize_backend(backend)
+        self.model_name = model_name
+        self.tokenizer = None
+        self.load_report = None
+        # Records or replays generate() calls when CASSETTE_MODE is set (or a cassette is passed in)
+        self.cassette = cassette if cassette is not None else get_cassette()
+        # Shared per-provider rate limiter (None for local generation or unconfigured providers)
+        self.scheduler = get_scheduler(self.backend) if self.backend not in ("transformers", "replay") else None
+        # Local generation cannot be cut short by a timeout (see _generate)
+        self.interruptible = self.backend != "transformers"
+        if self.backend == "replay":
+            # Serves recorded generations only; no client, no network
+            if self.cassette is None or self.cassette.mode != "replay":
+                self.cassette = Cassette(CASSETTE_PATH, "replay")
+            logger.info("Replaying LLM generations from %s", self.cassette.path)
+
+        elif self.backend == "gemini":
             try:
                 import google.generativeai as genai
                 if not GEMINI_API_KEY:
                     raise ValueError("GEMINI_API_KEY is not set")
                 genai.configure(api_key=GEMINI_API_KEY)
-                self.model = genai.GenerativeModel(LLM_MODEL_NAME)
-                logger.info("Using Google Gemini model %s", LLM_MODEL_NAME)
+                self.model = genai.GenerativeModel(model_name)
+                logger.info("Using Google Gemini model %s", model_name)
             except Exception as e:
                 logger.exception("Failed to initialize Gemini client: %s", e)
                 raise
 
-        elif LLM_BACKEND == "openrouter" or "meta-llama" in LLM_BACKEND.lower():
+        elif self.backend == "openrouter":
             if not OPENROUTER_API_KEY:
                 raise ValueError("OPENROUTER_API_KEY is not set")
             self.session = requests.Session()
@@ -33,24 +70,69 @@ class LLM:
                 "HTTP-Referer": "http://localhost",
                 "X-Title": "mcp-math-agent"
             })
-            logger.info("Using OpenRouter model %s", LLM_MODEL_NAME)
+            logger.info("Using OpenRouter model %s", model_name)
 
         else:
-            from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
-            self.tokenizer = AutoTokenizer.from_pretrained(LLM_MODEL_NAME, use_fast=True)
-            self.model = AutoModelForCausalLM.from_pretrained(LLM_MODEL_NAME)
+            from transformers import AutoTokenizer, pipeline
+            from agentturing.model.loading import load_causal_lm, LLM_LOAD_MODE
+            self.tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+            self.model, self.load_report = load_causal_lm(model_name, LLM_LOAD_MODE)
+            metrics.register("llm_load", lambda: self.load_report)
             self.generator = pipeline("text-generation", model=self.model, tokenizer=self.tokenizer)
-            logger.info("Using transformers model %s", LLM_MODEL_NAME)
+            logger.info("Using transformers model %s", model_name)
+
+        if self.tokenizer is None and LLM_TOKENIZER:
+            try:
+                from transformers import AutoTokenizer
+                self.tokenizer = AutoTokenizer.from_pretrained(LLM_TOKENIZER, use_fast=True)
+            except Exception as e:
+                logger.warning("Failed to load tokenizer %s, falling back to estimate: %s", LLM_TOKENIZER, e)
 
-    def generate(self, prompt: str, max_tokens: int = 256, temperature: float = 0.0) -> str:
-        if LLM_BACKEND == "gemini":
-            response = self.model.generate_content(prompt)
+    def count_tokens(self, text: str) -> int:
+        """Count tokens with the backend tokenizer, or estimate when none is available locally."""
+        if not text:
+            return 0
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False))
+        return max(1, -(-len(text) // CHARS_PER_TOKEN))
+
+    def generate(self, prompt: str, max_tokens: int = 256, temperature: float = 0.0,
+                 timeout: Optional[float] = None) -> str:
+        if self.cassette is None:
+            return self._generate(prompt, max_tokens, temperature, timeout)
+        # Keyed without the backend, so a recording from any provider replays on the replay backend
+        request = {"prompt": prompt, "max_tokens": max_tokens, "temperature": temperature}
+        return self.cassette.intercept("llm", request,
+                                       lambda: self._generate(prompt, max_tokens, temperature, timeout),
+                                       max_wait=timeout)
+
+    def _generate(self, prompt: str, max_tokens: int, temperature: float, timeout: Optional[float]) -> str:
+        if self.backend == "replay":
+            raise RuntimeError("The replay backend cannot record; set CASSETTE_MODE=record on a live backend")
+        reserved = 0
+        if self.scheduler is not None:
+            reserved = self.count_tokens(prompt) + max_tokens
+            waited = self.scheduler.acquire(reserved, timeout=timeout)
+            if timeout:
+                timeout = max(0.001, timeout - waited)
+
+        if self.backend == "gemini":
+            kwargs = {"request_options": {"timeout": timeout}} if timeout else {}
+            try:
+                response = self.model.generate_content(prompt, **kwargs)
+            except Exception as e:
+                if self.scheduler is not None and ("429" in str(e) or "ResourceExhausted" in type(e).__name__):
+                    self.scheduler.on_rate_limited()
+                raise
+            if self.scheduler is not None:
+                usage = getattr(response, "usage_metadata", None)
+                self.scheduler.settle(reserved, getattr(usage, "total_token_count", None))
             return response.text.strip()
 
-        elif LLM_BACKEND == "openrouter" or "meta-llama" in LLM_BACKEND.lower():
+        elif self.backend == "openrouter":
             url = "https://openrouter.ai/api/v1/chat/completions"
             payload = {
-                "model": LLM_MODEL_NAME,
+                "model": self.model_name,
                 "messages": [
                     {"role": "system", "content": "You are a helpful math tutor."},
                     {"role": "user", "content": prompt}
@@ -58,12 +140,20 @@ class LLM:
                 "max_tokens": max_tokens,
                 "temperature": temperature
             }
-            resp = self.session.post(url, json=payload, timeout=60)
+            resp = self.session.post(url, json=payload, timeout=timeout or DEFAULT_TIMEOUT)
+            if self.scheduler is not None:
+                self.scheduler.update_from_headers(resp.headers)
+                if resp.status_code == 429:
+                    retry_after = resp.headers.get("Retry-After")
+                    self.scheduler.on_rate_limited(parse_duration(retry_after) if retry_after else None)
             resp.raise_for_status()
             data = resp.json()
+            if self.scheduler is not None:
+                self.scheduler.settle(reserved, data.get("usage", {}).get("total_tokens"))
             return data["choices"][0]["message"]["content"].strip()
 
         else:
+            # Local generation cannot be interrupted; callers enforce timeouts around it
             out = self.generator(prompt, max_new_tokens=max_tokens, do_sample=False)
             text = out[0]["generated_text"]
             if text.startswith(prompt):
@@ -0,0 +1,89 @@
+import os
+import time
+import logging
+from typing import Any, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# default: library defaults | bf16: bfloat16 weights, loaded without an extra staging copy
+# int8: weight-only dynamic int8 for every nn.Linear (activations stay fp32), CPU only
+LLM_LOAD_MODE = os.getenv("LLM_LOAD_MODE", "default")
+LOAD_MODES = ("default", "bf16", "int8")
+
+
+def current_rss_mb() -> float:
+    """Resident set size now (Linux /proc; 0.0 where unavailable)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return 0.0
+
+
+def peak_rss_mb() -> float:
+    """Peak RSS of this process so far (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+    except ImportError:
+        return current_rss_mb()
+
+
+def _dtype_kwarg() -> str:
+    import transformers
+    # transformers 5 renamed torch_dtype -> dtype (the old name still works with a warning)
+    return "dtype" if int(transformers.__version__.split(".")[0]) >= 5 else "torch_dtype"
+
+
+def _weight_bytes(model) -> int:
+    from torch.ao.nn.quantized.dynamic import Linear as DynamicQuantizedLinear
+    total = sum(p.numel() * p.element_size() for p in model.parameters())
+    # Dynamically quantized Linear layers keep packed int8 weights outside parameters()
+    for module in model.modules():
+        if isinstance(module, DynamicQuantizedLinear):
+            for tensor in (module.weight(), module.bias()):
+                if tensor is not None:
+                    total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def load_causal_lm(model_name: str, mode: str = LLM_LOAD_MODE) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Load a causal LM for CPU inference in ``mode`` and return (model, report). The report has
+    load time, RSS before/after, peak RSS and weight bytes, so modes can be compared per node.
+    Peak RSS is per process; compare modes in fresh processes (tools/benchmark/llm_load_modes.py).
+    """
+    import torch
+    from transformers import AutoModelForCausalLM
+
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Unknown LLM_LOAD_MODE {mode!r}; expected one of {', '.join(LOAD_MODES)}")
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    if mode == "default":
+        model = AutoModelForCausalLM.from_pretrained(model_name)
+    else:
+        # Safetensors checkpoints are memory-mapped and copied straight into the target dtype;
+        # int8 quantizes from fp32 Linear weights, bf16 keeps half-size weights throughout
+        dtype = torch.bfloat16 if mode == "bf16" else torch.float32
+        model = AutoModelForCausalLM.from_pretrained(model_name, low_cpu_mem_usage=True, **{_dtype_kwarg(): dtype})
+        if mode == "int8":
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    model.eval()
+    report = {
+        "mode": mode,
+        "load_s": round(time.perf_counter() - start, 2),
+        "rss_before_mb": round(rss_before, 1),
+        "rss_after_mb": round(current_rss_mb(), 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "weights_mb": round(_weight_bytes(model) / 2**20, 1),
+    }
+    logger.info("Loaded %s (%s) in %.2fs: rss %.0f MB, peak %.0f MB, weights %.0f MB", model_name, mode,
+                report["load_s"], report["rss_after_mb"], report["peak_rss_mb"], report["weights_mb"])
+    return model, report
+
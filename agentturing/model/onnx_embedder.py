@@ -0,0 +1,147 @@
+import os
+import json
+import logging
+from typing import List, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", "agentturing/model/onnx")
+# 0 lets ONNX Runtime pick (one thread per physical core)
+EMBEDDING_ONNX_THREADS = int(os.getenv("EMBEDDING_ONNX_THREADS", "0"))
+
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+POOLING_FILE = "pooling.json"
+
+
+def onnx_dir_for(model_name: str) -> str:
+    return os.path.join(EMBEDDING_ONNX_DIR, model_name.replace("/", "__"))
+
+
+def _pooling_config(st) -> dict:
+    """Read pooling mode / normalization from a loaded SentenceTransformer."""
+    mode, normalize = "mean", False
+    for module in list(st)[1:]:
+        name = type(module).__name__
+        if name == "Pooling":
+            cfg = module.get_config_dict()
+            if "pooling_mode" in cfg:
+                mode = cfg["pooling_mode"]
+            elif cfg.get("pooling_mode_cls_token"):
+                mode = "cls"
+            elif cfg.get("pooling_mode_max_tokens"):
+                mode = "max"
+        elif name == "Normalize":
+            normalize = True
+    if mode not in ("mean", "cls", "max"):
+        raise ValueError(f"Unsupported pooling mode for ONNX export: {mode}")
+    return {"pooling": mode, "normalize": normalize, "max_seq_length": st.max_seq_length}
+
+
+def export_onnx(model_name: str, out_dir: Optional[str] = None, quantize: bool = False) -> str:
+    """
+    Export the transformer of a sentence-transformers model to ONNX (token embeddings output),
+    optionally followed by dynamic int8 weight quantization. Returns the model path to load.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    out_dir = out_dir or onnx_dir_for(model_name)
+    os.makedirs(out_dir, exist_ok=True)
+    fp32_path = os.path.join(out_dir, FP32_FILE)
+
+    if not os.path.exists(fp32_path):
+        st = SentenceTransformer(model_name, device="cpu")
+        hf_model = st[0].auto_model.eval()
+        tokenizer = st[0].tokenizer
+        dummy = tokenizer(["Solve 2*x + 3 = 7 for x."], return_tensors="pt")
+        input_names = [k for k in ("input_ids", "attention_mask", "token_type_ids") if k in dummy]
+
+        class _TokenEmbeddings(torch.nn.Module):
+            def __init__(self, model):
+                super().__init__()
+                self.model = model
+
+            def forward(self, *tensors):
+                return self.model(**dict(zip(input_names, tensors)))[0]
+
+        logger.info("Exporting %s to ONNX at %s", model_name, fp32_path)
+        with torch.no_grad():
+            torch.onnx.export(
+                _TokenEmbeddings(hf_model),
+                tuple(dummy[k] for k in input_names),
+                fp32_path,
+                input_names=input_names,
+                output_names=["token_embeddings"],
+                dynamic_axes={name: {0: "batch", 1: "sequence"} for name in input_names + ["token_embeddings"]},
+                opset_version=17,
+                dynamo=False,
+            )
+        tokenizer.save_pretrained(out_dir)
+        with open(os.path.join(out_dir, POOLING_FILE), "w") as f:
+            json.dump(dict(_pooling_config(st), dimension=st.get_sentence_embedding_dimension()), f)
+
+    if not quantize:
+        return fp32_path
+
+    int8_path = os.path.join(out_dir, INT8_FILE)
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        logger.info("Quantizing %s to int8 at %s", fp32_path, int8_path)
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    return int8_path
+
+
+class OnnxEmbedder:
+    """SentenceTransformer-compatible ``encode`` running an exported model under ONNX Runtime."""
+
+    def __init__(self, model_name: str, quantize: bool = False, onnx_dir: Optional[str] = None,
+                 threads: int = EMBEDDING_ONNX_THREADS):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        onnx_dir = onnx_dir or onnx_dir_for(model_name)
+        path = export_onnx(model_name, onnx_dir, quantize=quantize)
+        with open(os.path.join(onnx_dir, POOLING_FILE)) as f:
+            self.config = json.load(f)
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        opts.intra_op_num_threads = threads
+        opts.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(path, opts, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(onnx_dir)
+        logger.info("Using ONNX Runtime embedder %s (%s)", model_name, os.path.basename(path))
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config["dimension"]
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        out = []
+        for i in range(0, len(texts), batch_size):
+            out.append(self._encode_batch(texts[i:i + batch_size]))
+        vectors = np.concatenate(out) if out else np.zeros((0, self.get_sentence_embedding_dimension()), np.float32)
+        return vectors[0] if single else vectors
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        enc = self.tokenizer(texts, padding=True, truncation=True,
+                             max_length=self.config["max_seq_length"], return_tensors="np")
+        feeds = {name: enc[name].astype(np.int64) for name in self.input_names}
+        tokens = self.session.run(None, feeds)[0]
+        mask = enc["attention_mask"][..., None].astype(tokens.dtype)
+        if self.config["pooling"] == "cls":
+            pooled = tokens[:, 0]
+        elif self.config["pooling"] == "max":
+            pooled = np.where(mask > 0, tokens, -1e9).max(axis=1)
+        else:
+            pooled = (tokens * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.config["normalize"]:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
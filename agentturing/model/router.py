@@ -0,0 +1,299 @@
+import os
+import time
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Dict, List, Optional
+
+from agentturing.model.llm import LLM, LLM_BACKEND, LLM_MODEL_NAME, normalize_backend
+from agentturing.utils import metrics
+from agentturing.utils.metrics import LatencyWindow
+from agentturing.utils.resilience import CircuitBreaker, backoff_delay
+from agentturing.utils.deadline import Deadline, RequestCancelled
+from agentturing.llm.scheduler import RateLimited
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated backends in preference order, e.g. "openrouter,gemini,transformers"
+LLM_ROUTER_BACKENDS = os.getenv("LLM_ROUTER_BACKENDS", LLM_BACKEND)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "3"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+# How often blocked waits re-check the request deadline / cancel flag
+LLM_CANCEL_POLL = 0.1
+# Latency samples needed before a backend's p95 is trusted as the hedge trigger
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_ROUTER_WORKERS = int(os.getenv("LLM_ROUTER_WORKERS", "16"))
+
+DEFAULT_TIMEOUTS = {"gemini": 20.0, "openrouter": 30.0, "transformers": 120.0, "replay": 30.0}
+DEFAULT_MODELS = {
+    "gemini": "gemini-1.5-flash",
+    "openrouter": "meta-llama/llama-3.2-3b-instruct:free",
+    "transformers": "Qwen/Qwen2.5-Math-1.5B-Instruct",
+    "replay": "cassette",
+}
+
+
+def _backend_timeout(name: str) -> float:
+    return float(os.getenv(f"LLM_TIMEOUT_{name.upper()}", DEFAULT_TIMEOUTS.get(name, 60.0)))
+
+
+def _backend_model(name: str) -> str:
+    override = os.getenv(f"{name.upper()}_MODEL_NAME")
+    if override:
+        return override
+    if name == normalize_backend(LLM_BACKEND):
+        return LLM_MODEL_NAME
+    return DEFAULT_MODELS[name]
+
+
+class _Backend:
+    def __init__(self, name: str, client: Any, timeout: float, breaker: CircuitBreaker):
+        self.name = name
+        self.client = client
+        self.timeout = timeout
+        self.breaker = breaker
+        # Local generation keeps running after the router gives up on it, so it is never retried
+        self.interruptible = getattr(client, "interruptible", True)
+        self.latency = LatencyWindow()
+        self.counters = {
+            "calls": 0, "successes": 0, "failures": 0, "timeouts": 0,
+            "retries": 0, "served": 0, "hedges_fired": 0, "hedge_wins": 0, "skipped_open": 0,
+            "rate_limited": 0, "late": 0,
+        }
+
+
+class _Attempt:
+    """
+    One backend call. Its breaker outcome is recorded exactly once, by whichever side settles it
+    first: the call finishing, or the router abandoning it on timeout.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._settled = False
+
+    def settle(self) -> bool:
+        with self._lock:
+            if self._settled:
+                return False
+            self._settled = True
+            return True
+
+
+class LLMRouter:
+    """
+    Routes ``generate`` calls over several LLM backends with per-backend timeouts,
+    jittered retries, circuit breakers and optional hedged requests.
+    Exposes the same ``generate``/``count_tokens`` interface as ``LLM``.
+    """
+
+    def __init__(self, backends: Optional[Dict[str, Any]] = None, max_retries: int = LLM_MAX_RETRIES,
+                 backoff_base: float = LLM_BACKOFF_BASE, hedge: bool = LLM_HEDGE,
+                 hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES, timeouts: Optional[Dict[str, float]] = None):
+        if backends is None:
+            backends = self._load_backends(LLM_ROUTER_BACKENDS.split(","))
+        if not backends:
+            raise RuntimeError("No LLM backend could be initialized")
+        timeouts = timeouts or {}
+        self.backends: List[_Backend] = [
+            _Backend(
+                name, client, timeouts.get(name, _backend_timeout(name)),
+                CircuitBreaker(f"llm:{name}", LLM_BREAKER_THRESHOLD, LLM_BREAKER_COOLDOWN),
+            )
+            for name, client in backends.items()
+        ]
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=LLM_ROUTER_WORKERS, thread_name_prefix="llm-router")
+        metrics.register("llm_router", self.stats)
+        logger.info("LLM router backends: %s (hedging=%s)", [b.name for b in self.backends], hedge)
+
+    @staticmethod
+    def _load_backends(names: List[str]) -> Dict[str, Any]:
+        loaded = {}
+        for raw in names:
+            if not raw.strip():
+                continue
+            name = normalize_backend(raw)
+            if name in loaded:
+                continue
+            try:
+                loaded[name] = LLM(backend=name, model_name=_backend_model(name))
+            except Exception as e:
+                logger.warning("Skipping LLM backend %s: %s", name, e)
+        return loaded
+
+    def count_tokens(self, text: str) -> int:
+        return self.backends[0].client.count_tokens(text)
+
+    def generate(self, prompt: str, max_tokens: int = 256, temperature: float = 0.0,
+                 deadline: Optional[Deadline] = None) -> str:
+        deadline = deadline or Deadline()
+        last_exc: Optional[BaseException] = None
+        for backend in self.backends:
+            for attempt in range(self.max_retries + 1):
+                deadline.check("llm")
+                if not backend.breaker.allow():
+                    self._incr(backend, "skipped_open")
+                    break
+                if attempt:
+                    self._incr(backend, "retries")
+                try:
+                    return self._call(backend, prompt, max_tokens, temperature, deadline)
+                except RequestCancelled:
+                    raise
+                except RateLimited as e:
+                    # The local budget is spent; retrying the same backend would only burn the deadline
+                    last_exc = e
+                    logger.warning("LLM backend %s rate limited, failing over: %s", backend.name, e)
+                    break
+                except Exception as e:
+                    last_exc = e
+                    logger.warning("LLM backend %s attempt %d failed: %s", backend.name, attempt + 1, e)
+                    if isinstance(e, TimeoutError) and not backend.interruptible:
+                        # The abandoned generation is still running; a retry would stack another one
+                        break
+                if attempt < self.max_retries:
+                    deadline.sleep(backoff_delay(attempt, self.backoff_base))
+        raise RuntimeError("All LLM backends failed") from last_exc
+
+    def _invoke(self, backend: _Backend, attempt: _Attempt, prompt: str, max_tokens: int, temperature: float,
+                timeout: float) -> str:
+        self._incr(backend, "calls")
+        start = time.perf_counter()
+        try:
+            out = backend.client.generate(prompt, max_tokens=max_tokens, temperature=temperature,
+                                          timeout=timeout)
+        except RateLimited:
+            # Our own client-side budget, not a backend fault: fail over without tripping the breaker,
+            # but hand back a half-open probe slot so the next call can still probe the backend
+            if attempt.settle():
+                self._incr(backend, "rate_limited")
+                backend.breaker.release_probe()
+            raise
+        except Exception:
+            if attempt.settle():
+                self._incr(backend, "failures")
+                backend.breaker.record_failure()
+            else:
+                self._incr(backend, "late")
+            raise
+        if not attempt.settle():
+            # Already counted as a timeout; a late answer must not close the breaker again
+            self._incr(backend, "late")
+            return out
+        backend.latency.observe(time.perf_counter() - start)
+        self._incr(backend, "successes")
+        backend.breaker.record_success()
+        return out
+
+    def _submit(self, backend: _Backend, prompt: str, max_tokens: int, temperature: float, timeout: float):
+        attempt = _Attempt()
+        # Run in a copy of the caller's context so backend logs keep the request ID
+        fut = self._executor.submit(contextvars.copy_context().run, self._invoke,
+                                    backend, attempt, prompt, max_tokens, temperature, timeout)
+        return fut, attempt
+
+    def _hedge_delay(self, backend: _Backend) -> Optional[float]:
+        if not self.hedge or len(backend.latency) < self.hedge_min_samples:
+            return None
+        return backend.latency.percentile(95)
+
+    def _hedge_partner(self, primary: _Backend) -> Optional[_Backend]:
+        for backend in self.backends:
+            if backend is not primary and backend.breaker.allow():
+                return backend
+        return None
+
+    def _wait(self, futures, timeout: float, deadline: Deadline):
+        """``wait(FIRST_COMPLETED)`` that gives up early when the request is cancelled."""
+        end = time.monotonic() + timeout
+        pending = set(futures)
+        while True:
+            left = end - time.monotonic()
+            done, pending = wait(pending, timeout=max(0.0, min(left, LLM_CANCEL_POLL)), return_when=FIRST_COMPLETED)
+            if done or left <= 0:
+                return done, pending
+            deadline.check("llm")
+
+    def _call(self, backend: _Backend, prompt: str, max_tokens: int, temperature: float, deadline: Deadline) -> str:
+        start = time.monotonic()
+        timeout = deadline.timeout(backend.timeout)
+        fut, attempt = self._submit(backend, prompt, max_tokens, temperature, timeout)
+        hedge_after = self._hedge_delay(backend)
+        if hedge_after is not None and hedge_after < timeout:
+            done, _ = self._wait([fut], hedge_after, deadline)
+            partner = None if done else self._hedge_partner(backend)
+            if partner is not None:
+                return self._race(backend, fut, attempt, partner, prompt, max_tokens, temperature, start, deadline)
+        done, _ = self._wait([fut], max(0.0, timeout - (time.monotonic() - start)), deadline)
+        if not done:
+            deadline.check("llm")
+            if self._abandon(backend, attempt):
+                raise TimeoutError(f"LLM backend {backend.name} timed out after {timeout:.1f}s")
+        # Either done, or it settled itself just as we gave up: its outcome is about to land
+        out = fut.result()
+        self._incr(backend, "served")
+        return out
+
+    def _race(self, primary: _Backend, primary_fut, primary_attempt: _Attempt, partner: _Backend, prompt: str,
+              max_tokens: int, temperature: float, start: float, deadline: Deadline) -> str:
+        """Fire ``partner`` alongside the slow primary call and return whichever answers first."""
+        self._incr(primary, "hedges_fired")
+        partner_start = time.monotonic()
+        partner_timeout = deadline.timeout(partner.timeout)
+        partner_fut, partner_attempt = self._submit(partner, prompt, max_tokens, temperature, partner_timeout)
+        owners = {
+            primary_fut: (primary, primary_attempt, deadline.timeout(primary.timeout - (partner_start - start))),
+            partner_fut: (partner, partner_attempt, partner_timeout),
+        }
+        pending = set(owners)
+        last_exc: Optional[BaseException] = None
+        while pending:
+            remaining = max(owners[f][2] - (time.monotonic() - partner_start) for f in pending)
+            done, pending = self._wait(pending, max(0.0, remaining), deadline)
+            if not done:
+                break
+            for f in done:
+                backend = owners[f][0]
+                try:
+                    out = f.result()
+                except Exception as e:
+                    last_exc = e
+                    continue
+                self._incr(backend, "served")
+                if backend is partner:
+                    self._incr(partner, "hedge_wins")
+                return out
+        deadline.check("llm")
+        for f in pending:
+            self._abandon(owners[f][0], owners[f][1])
+        if last_exc is not None:
+            raise last_exc
+        raise TimeoutError(f"LLM backends {primary.name}/{partner.name} timed out")
+
+    def _abandon(self, backend: _Backend, attempt: _Attempt) -> bool:
+        """Give up on a call still running and charge the timeout, unless it settled itself first."""
+        if not attempt.settle():
+            return False
+        self._incr(backend, "timeouts")
+        backend.breaker.record_failure()
+        return True
+
+    def _incr(self, backend: _Backend, key: str):
+        with self._lock:
+            backend.counters[key] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                b.name: dict(b.counters, breaker=b.breaker.state, timeout=b.timeout, latency=b.latency.summary())
+                for b in self.backends
+            }
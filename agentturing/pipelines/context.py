@@ -0,0 +1,96 @@
+import os
+import logging
+from typing import Callable, Dict, Any, List
+
+from agentturing.utils.text import shingles
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+CONTEXT_MIN_CHUNK_TOKENS = int(os.getenv("CONTEXT_MIN_CHUNK_TOKENS", "64"))
+
+class ContextAssembler:
+    """Deduplicate, rank and pack retrieved passages into a token budget.
+
+    Token counts come from ``count_tokens`` (normally ``LLM.count_tokens``) so the
+    budget is expressed in the units of the backend that will read the prompt.
+    """
+
+    def __init__(self, count_tokens: Callable[[str], int], budget: int = CONTEXT_TOKEN_BUDGET,
+                 dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD,
+                 min_chunk_tokens: int = CONTEXT_MIN_CHUNK_TOKENS):
+        self.count_tokens = count_tokens
+        self.budget = budget
+        self.dedup_threshold = dedup_threshold
+        self.min_chunk_tokens = min_chunk_tokens
+
+    def assemble(self, question: str, candidates: List[Dict[str, Any]], label_sources: bool = False) -> Dict[str, Any]:
+        """
+        candidates: [{"text": "", "source": "", "score": 0.0}, ...]
+        Returns {"context": str, "sources": [...], "usage": {...}}.
+        """
+        ranked = sorted(
+            (c for c in candidates if c.get("text")),
+            key=lambda c: c.get("score") if c.get("score") is not None else 0.0,
+            reverse=True,
+        )
+        unique = self._dedup(ranked)
+
+        blocks, sources = [], []
+        used = 0
+        truncated = 0
+        sep_tokens = self.count_tokens("\n\n")
+        for cand in unique:
+            text = cand["text"].strip()
+            if label_sources:
+                text = f"[source {len(blocks) + 1}] {text}"
+            cost = self.count_tokens(text) + (sep_tokens if blocks else 0)
+            remaining = self.budget - used
+            if cost > remaining:
+                room = remaining - (sep_tokens if blocks else 0)
+                if room < self.min_chunk_tokens:
+                    break
+                text = self._truncate(text, room)
+                cost = self.count_tokens(text) + (sep_tokens if blocks else 0)
+                truncated += 1
+            blocks.append(text)
+            sources.append(cand.get("source"))
+            used += cost
+
+        usage = {
+            "context_tokens": used,
+            "question_tokens": self.count_tokens(question),
+            "context_budget": self.budget,
+            "passages_used": len(blocks),
+            "passages_deduped": len(ranked) - len(unique),
+            "passages_dropped": len(unique) - len(blocks),
+            "passages_truncated": truncated,
+        }
+        logger.debug("Assembled context: %s", usage)
+        return {"context": "\n\n".join(blocks), "sources": sources, "usage": usage}
+
+    def _dedup(self, ranked: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop passages whose shingles are mostly contained in a higher-ranked passage."""
+        kept, kept_shingles = [], []
+        for cand in ranked:
+            sh = shingles(cand["text"])
+            duplicate = False
+            for other in kept_shingles:
+                smaller = min(len(sh), len(other))
+                if smaller and len(sh & other) / smaller >= self.dedup_threshold:
+                    duplicate = True
+                    break
+            if not duplicate:
+                kept.append(cand)
+                kept_shingles.append(sh)
+        return kept
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        tokens = self.count_tokens(text)
+        if tokens <= max_tokens:
+            return text
+        cut = int(len(text) * max_tokens / tokens)
+        while cut > 0 and self.count_tokens(text[:cut]) > max_tokens:
+            cut = int(cut * 0.9)
+        return text[:cut].rstrip()
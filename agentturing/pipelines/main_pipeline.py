@@ -1,28 +1,75 @@
 import os
 import logging
+import threading
 from typing import Optional, Dict, Any
-from agentturing.database.vectorstore import QdrantVectorStore
-from agentturing.model.llm import LLM
+from agentturing.database.vectorstore import make_vector_store
+from agentturing.database.passage_store import payload_text
+from agentturing.model.embeddings import load_embedder
+from agentturing.model.router import LLMRouter
 from agentturing.mcp.client import MCPClient
+from agentturing.guardrails.policy import GuardrailPolicy, REFUSAL
+from agentturing.pipelines.context import ContextAssembler
+from agentturing.utils import metrics
+from agentturing.utils.admission import AdmissionController, DEFAULT_PRIORITY
+from agentturing.utils.deadline import Deadline
+from agentturing.utils.logging_config import stage_timer
 from agentturing.utils.sanitize import sanitize_output, contains_pii
 
 logger = logging.getLogger(__name__)
 
 KB_MATCH_THRESHOLD = 0.70
+QDRANT_QUERY_TIMEOUT = float(os.getenv("QDRANT_QUERY_TIMEOUT", "10"))
+MCP_SEARCH_TIMEOUT = float(os.getenv("MCP_SEARCH_TIMEOUT", "10"))
 
 class AgentPipeline:
-    def __init__(self):
-        self.store = QdrantVectorStore()
-        self.llm = LLM()
-        self.mcp = MCPClient()
+    def __init__(self, store=None, llm=None, mcp=None, embedder=None):
+        # Components can be injected (offline benchmarks and tests); by default they come from the environment.
+        # One Qdrant collection, or hash-partitioned shards when QDRANT_SHARDS is set
+        self.store = store if store is not None else make_vector_store()
+        if hasattr(self.store, "stats"):
+            metrics.register("vector_shards", self.store.stats)
+        self.llm = llm if llm is not None else LLMRouter()
+        self.mcp = mcp if mcp is not None else MCPClient()
+        self.assembler = ContextAssembler(self.llm.count_tokens)
+        self.admission = AdmissionController()
+        metrics.register("admission", self.admission.stats)
+        self.guards = GuardrailPolicy()
+        metrics.register("guardrails", self.guards.stats)
+        self._embedder = embedder
+        self._embedder_lock = threading.Lock()
 
-    def ask(self, question: str, top_k: int = 3) -> Dict[str, Any]:
+    @property
+    def embedder(self):
+        """Query encoder, loaded once on first use (same model/backend as ingestion)."""
+        if self._embedder is None:
+            with self._embedder_lock:
+                if self._embedder is None:
+                    self._embedder = load_embedder(os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"))
+        return self._embedder
+
+    def ask(self, question: str, top_k: int = 3, deadline: Optional[Deadline] = None,
+            priority: str = DEFAULT_PRIORITY) -> Dict[str, Any]:
+        # Every stage checks the deadline first and bounds its downstream call by the time left.
+        # Stages run inside admission slots (kb/mcp/llm), which raise Overloaded instead of queueing forever.
+        deadline = deadline or Deadline()
+        # Input validation overlaps embedding/retrieval; it is joined before MCP or the LLM see the question
+        pending_verdict = self.guards.start_input(question)
+        if pending_verdict.done() and not pending_verdict.result().allowed:
+            return self._refusal(pending_verdict.result().reason)
         # 1) Check KB
-        # Compute embedding using same embedder as ingestion
-        from sentence_transformers import SentenceTransformer
-        embed_model = SentenceTransformer(os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"))
-        q_embedding = embed_model.encode(question).tolist()
-        hits = self.store.query(q_embedding, top_k=top_k)
+        with self.admission.slot("kb", priority, deadline):
+            # Compute embedding using same embedder as ingestion
+            deadline.check("embed")
+            with stage_timer("embed"):
+                q_embedding = self.embedder.encode(question).tolist()
+            deadline.check("retrieve")
+            with stage_timer("retrieve"):
+                hits = self.store.query(q_embedding, top_k=top_k, timeout=deadline.timeout(QDRANT_QUERY_TIMEOUT))
+        logger.debug("retrieved %d hits (top score %s)", len(hits or []), hits[0].score if hits else None)
+        with stage_timer("guard_wait"):
+            verdict = self.guards.join_input(pending_verdict, timeout=deadline.timeout(self.guards.timeout))
+        if not verdict.allowed:
+            return self._refusal(verdict.reason)
         # Determine if KB has a good match
         route = "llm"
         answer = None
@@ -30,36 +77,61 @@ class AgentPipeline:
         if hits and len(hits) > 0 and hits[0].score is not None and hits[0].score >= KB_MATCH_THRESHOLD:
             # Use retrieved context to produce step-by-step answer
             route = "kb"
-            context = "\n\n".join([h.payload.get("text_excerpt", "") for h in hits])
-            prompt = self._build_prompt(question, context=context, source_type="kb")
-            raw = self.llm.generate(prompt, max_tokens=400)
+            candidates = [
+                {
+                    "text": payload_text(h.payload),
+                    "source": h.payload.get("source"),
+                    "score": h.score,
+                }
+                for h in hits
+            ]
+            packed = self.assembler.assemble(question, candidates, label_sources=True)
+            prompt = self._build_prompt(question, context=packed["context"], source_type="kb")
+            with self.admission.slot("llm", priority, deadline), stage_timer("llm"):
+                raw = self.llm.generate(prompt, max_tokens=400, deadline=deadline)
             answer = sanitize_output(raw)
-            sources = [h.payload.get("source") for h in hits]
+            sources = [src for src in packed["sources"] if src]
         else:
             # Not confident in KB -> use MCP websearch, then LLM
-            web = self.mcp.web_search(question)
+            with self.admission.slot("mcp", priority, deadline):
+                deadline.check("mcp")
+                with stage_timer("mcp"):
+                    budget = deadline.timeout(MCP_SEARCH_TIMEOUT)
+                    web = self.mcp.web_search(question, timeout=budget, timeout_capped=budget < MCP_SEARCH_TIMEOUT)
             route = "mcp" if web.get("results") else "llm"
-            context = ""
-            if web.get("results"):
-                context = "\n\n".join([f"{r.get('title')}: {r.get('snippet')}" for r in web["results"]])
-            prompt = self._build_prompt(question, context=context, source_type=route)
-            raw = self.llm.generate(prompt, max_tokens=400)
+            candidates = [
+                {
+                    "text": f"{r.get('title')}: {r.get('snippet')}",
+                    "source": r.get("url"),
+                    "score": r.get("score"),
+                }
+                for r in web.get("results", [])
+            ]
+            packed = self.assembler.assemble(question, candidates)
+            prompt = self._build_prompt(question, context=packed["context"], source_type=route)
+            with self.admission.slot("llm", priority, deadline), stage_timer("llm"):
+                raw = self.llm.generate(prompt, max_tokens=400, deadline=deadline)
             answer = sanitize_output(raw)
-            if web.get("results"):
-                sources = [r.get("url") for r in web["results"]]
-            else:
-                sources = []
+            sources = [src for src in packed["sources"] if src]
 
         # Additional PII detection
         pii = contains_pii(answer)
         if pii:
             answer = "[REDACTED DUE TO PII]."
+        else:
+            with stage_timer("guard_output"):
+                answer = self.guards.check_output(answer)
         return {
             "answer": answer,
             "route": route,
-            "sources": sources
+            "sources": sources,
+            "usage": packed["usage"],
         }
 
+    def _refusal(self, reason: str) -> Dict[str, Any]:
+        logger.info("Question rejected by guardrails: %s", reason)
+        return {"answer": REFUSAL, "route": "guardrails", "sources": [], "usage": None}
+
     def _build_prompt(self, question: str, context: str = "", source_type="kb"):
         sys = "You are a math tutor. Provide step-by-step solution and final answer. Explain reasoning."
         if source_type == "kb":
@@ -0,0 +1,146 @@
+import os
+import math
+import time
+import heapq
+import itertools
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+from agentturing.utils.deadline import Deadline
+from agentturing.utils.metrics import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+# route=concurrency:queue pairs for the pipeline stages
+ADMISSION_LIMITS = os.getenv("ADMISSION_LIMITS", "kb=16:64,mcp=8:32,llm=4:32")
+ADMISSION_MAX_QUEUE_WAIT_S = float(os.getenv("ADMISSION_MAX_QUEUE_WAIT_S", "10"))
+# Lower value is served first
+PRIORITIES = {"interactive": 0, "batch": 1}
+DEFAULT_PRIORITY = "interactive"
+# Service time assumed for a stage until real samples exist
+DEFAULT_SERVICE_S = 1.0
+WAIT_POLL_S = 0.1
+
+
+class Overloaded(Exception):
+    """A stage's queue is full or its expected queue time exceeds the budget; retry later."""
+
+    def __init__(self, route: str, retry_after: float):
+        self.route = route
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f"{route} stage overloaded, retry after {self.retry_after}s")
+
+
+class StageLimiter:
+    """Bounded concurrency plus a bounded priority queue for one pipeline stage."""
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int,
+                 max_queue_wait: float = ADMISSION_MAX_QUEUE_WAIT_S):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_queue_wait = max_queue_wait
+        self.active = 0
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self.service = LatencyWindow()
+        self.queue_wait = LatencyWindow()
+        self.counters = {"admitted": 0, "queued": 0, "shed_full": 0, "shed_wait": 0, "shed_timeout": 0}
+
+    def _expected_wait(self, ahead: int) -> float:
+        service = self.service.mean() or DEFAULT_SERVICE_S
+        return (ahead // self.max_concurrency + 1) * service
+
+    def acquire(self, priority: int = 0, deadline: Optional[Deadline] = None):
+        with self._cond:
+            if self.active < self.max_concurrency and not self._queue:
+                self.active += 1
+                self.counters["admitted"] += 1
+                self.queue_wait.observe(0.0)
+                return
+            if len(self._queue) >= self.max_queue:
+                self.counters["shed_full"] += 1
+                raise Overloaded(self.name, self._expected_wait(len(self._queue)))
+            budget = self.max_queue_wait if deadline is None else deadline.timeout(self.max_queue_wait)
+            ahead = sum(1 for entry in self._queue if entry[0] <= priority)
+            expected = self._expected_wait(ahead)
+            if expected > budget:
+                self.counters["shed_wait"] += 1
+                raise Overloaded(self.name, expected)
+
+            entry = (priority, next(self._seq))
+            heapq.heappush(self._queue, entry)
+            self.counters["queued"] += 1
+            start = time.monotonic()
+            try:
+                while not (self._queue[0] == entry and self.active < self.max_concurrency):
+                    left = budget - (time.monotonic() - start)
+                    if left <= 0:
+                        self.counters["shed_timeout"] += 1
+                        raise Overloaded(self.name, self._expected_wait(len(self._queue)))
+                    if deadline is not None:
+                        deadline.check(self.name)
+                    self._cond.wait(min(left, WAIT_POLL_S))
+            except BaseException:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+                raise
+            heapq.heappop(self._queue)
+            self.active += 1
+            self.counters["admitted"] += 1
+            self.queue_wait.observe(time.monotonic() - start)
+
+    def release(self, service_time: float):
+        with self._cond:
+            self.active -= 1
+            self.service.observe(service_time)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return dict(
+                self.counters,
+                active=self.active,
+                queued_now=len(self._queue),
+                max_concurrency=self.max_concurrency,
+                max_queue=self.max_queue,
+                queue_wait=self.queue_wait.summary(),
+                service=self.service.summary(),
+            )
+
+
+class AdmissionController:
+    """Per-route (kb/mcp/llm) stage limiters; ``slot`` raises ``Overloaded`` instead of piling up work."""
+
+    def __init__(self, limits: str = ADMISSION_LIMITS, max_queue_wait: float = ADMISSION_MAX_QUEUE_WAIT_S):
+        self.stages: Dict[str, StageLimiter] = {}
+        for spec in limits.split(","):
+            if not spec.strip():
+                continue
+            route, sizes = spec.split("=")
+            concurrency, queue = sizes.split(":")
+            self.stages[route.strip()] = StageLimiter(route.strip(), int(concurrency), int(queue), max_queue_wait)
+
+    def capacity(self) -> int:
+        """Upper bound on requests that can be inside the pipeline at once."""
+        return sum(s.max_concurrency + s.max_queue for s in self.stages.values())
+
+    @contextmanager
+    def slot(self, route: str, priority: str = DEFAULT_PRIORITY, deadline: Optional[Deadline] = None):
+        stage = self.stages.get(route)
+        if stage is None:
+            yield
+            return
+        stage.acquire(PRIORITIES.get(priority, PRIORITIES[DEFAULT_PRIORITY]), deadline)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            stage.release(time.monotonic() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        return {route: stage.stats() for route, stage in self.stages.items()}
@@ -0,0 +1,212 @@
+import os
+import gzip
+import json
+import time
+import queue
+import atexit
+import hashlib
+import logging
+import builtins
+import importlib
+import threading
+from collections import defaultdict
+from logging.handlers import QueueListener
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# off | record | replay
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off")
+CASSETTE_PATH = os.getenv("CASSETTE_PATH", "tools/benchmark/cassettes/default.jsonl.gz")
+# Replay sleeps recorded_latency * scale (0 = instant, 1 = as recorded)
+CASSETTE_LATENCY_SCALE = float(os.getenv("CASSETTE_LATENCY_SCALE", "0"))
+PREVIEW_CHARS = 120
+# Modules whose exception classes replay may import to re-raise a recorded error as the same type
+_ERROR_MODULES = ("agentturing.", "httpx", "requests", "google.api_core")
+
+
+class CassetteMiss(KeyError):
+    """Replay found no recording for this request."""
+
+
+def request_key(kind: str, request: Dict[str, Any]) -> str:
+    blob = json.dumps({"kind": kind, **request}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:32]
+
+
+def _describe_error(e: Exception) -> Dict[str, Any]:
+    error = {"type": f"{type(e).__module__}.{type(e).__qualname__}", "message": str(e)}
+    status = getattr(getattr(e, "response", None), "status_code", None)
+    if status is not None:
+        error["status"] = status
+    return error
+
+
+def _rebuild_error(error) -> Exception:
+    """
+    Re-create a recorded error as its original type, so replay takes the same retry/breaker path
+    as the live call did (RateLimited, TimeoutError, HTTP status errors, ...). Unknown types fall
+    back to RuntimeError.
+    """
+    if isinstance(error, str):
+        return RuntimeError(f"replayed error: {error}")
+    module, _, name = error["type"].rpartition(".")
+    message = error.get("message", "")
+    cls = None
+    if module == "builtins":
+        cls = getattr(builtins, name, None)
+    elif module.startswith(_ERROR_MODULES):
+        try:
+            cls = getattr(importlib.import_module(module), name, None)
+        except ImportError:
+            cls = None
+    if not (isinstance(cls, type) and issubclass(cls, Exception)):
+        return RuntimeError(f"replayed {error['type']}: {message}")
+    if module.startswith("httpx"):
+        import httpx
+        if issubclass(cls, httpx.HTTPStatusError):
+            request = httpx.Request("POST", "http://replay")
+            return cls(message, request=request, response=httpx.Response(error.get("status", 500), request=request))
+    if module.startswith("requests") and "status" in error:
+        import requests
+        response = requests.Response()
+        response.status_code = error["status"]
+        return cls(message, response=response)
+    try:
+        return cls(message)
+    except Exception:
+        return RuntimeError(f"replayed {error['type']}: {message}")
+
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class _EntryHandler(logging.FileHandler):
+    """Writes queued entries as JSON lines through one long-lived (possibly gzip) stream."""
+
+    def __init__(self, path: str):
+        super().__init__(path, mode="a", encoding="utf-8", delay=True)
+
+    def _open(self):
+        return _open(self.baseFilename, self.mode)
+
+    def format(self, record):
+        return json.dumps(record.msg, ensure_ascii=False)
+
+
+class Cassette:
+    """
+    Recorded request/response pairs for external calls (``llm`` generations, ``mcp`` searches),
+    one JSON line each: kind, request key, a short preview, the response (or error) and the
+    observed latency. Requests are keyed by a hash of their content, so prompts are not stored
+    in full. Replay returns the recordings for a key in order, cycling when they run out.
+    """
+
+    def __init__(self, path: str = CASSETTE_PATH, mode: str = "replay", latency_scale: float = CASSETTE_LATENCY_SCALE):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._cursor: Dict[str, int] = defaultdict(int)
+        self.counters = {"recorded": 0, "replayed": 0, "misses": 0}
+        self._queue: "queue.Queue" = queue.Queue()
+        self._listener = None
+        if mode == "replay":
+            self._load()
+        else:
+            # Entries are written by a background listener to a single open stream, so a recorded
+            # call only pays for a queue put, and a .gz cassette stays one gzip member
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._listener = QueueListener(self._queue, _EntryHandler(path))
+            self._listener.start()
+            atexit.register(self.close)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            logger.warning("Cassette %s not found; every replay will miss", self.path)
+            return
+        with _open(self.path, "r") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries[entry["key"]].append(entry)
+        logger.info("Loaded %d recordings from %s", sum(len(v) for v in self._entries.values()), self.path)
+
+    def record(self, kind: str, request: Dict[str, Any], call: Callable[[], Any]) -> Any:
+        """Run ``call`` and append its outcome (response or error) with its latency."""
+        start = time.perf_counter()
+        entry = {"kind": kind, "key": request_key(kind, request),
+                 "preview": str(next(iter(request.values()), ""))[:PREVIEW_CHARS]}
+        try:
+            entry["response"] = call()
+            return entry["response"]
+        except Exception as e:
+            entry["error"] = _describe_error(e)
+            raise
+        finally:
+            entry["latency_s"] = round(time.perf_counter() - start, 4)
+            self._queue.put_nowait(logging.makeLogRecord({"msg": entry}))
+            with self._lock:
+                self.counters["recorded"] += 1
+
+    def replay(self, kind: str, request: Dict[str, Any], max_wait: Optional[float] = None) -> Any:
+        """Serve the next recording for this request, sleeping its scaled latency (bounded by ``max_wait``)."""
+        key = request_key(kind, request)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.counters["misses"] += 1
+                raise CassetteMiss(f"no {kind} recording for key {key}")
+            entry = entries[self._cursor[key] % len(entries)]
+            self._cursor[key] += 1
+            self.counters["replayed"] += 1
+        delay = entry.get("latency_s", 0.0) * self.latency_scale
+        if delay > 0:
+            if max_wait is not None and delay > max_wait:
+                time.sleep(max_wait)
+                raise TimeoutError(f"replayed {kind} call exceeded {max_wait:.1f}s")
+            time.sleep(delay)
+        if "error" in entry:
+            raise _rebuild_error(entry["error"])
+        return entry["response"]
+
+    def intercept(self, kind: str, request: Dict[str, Any], call: Callable[[], Any],
+                  max_wait: Optional[float] = None) -> Any:
+        if self.mode == "record":
+            return self.record(kind, request, call)
+        return self.replay(kind, request, max_wait)
+
+    def close(self):
+        """Flush queued recordings and close the cassette file."""
+        if self._listener is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counters, mode=self.mode, path=self.path)
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """Process-wide cassette configured by CASSETTE_MODE, or None when off."""
+    global _cassette
+    if CASSETTE_MODE == "off":
+        return None
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(CASSETTE_PATH, CASSETTE_MODE)
+            from agentturing.utils import metrics
+            metrics.register("cassette", _cassette.stats)
+        return _cassette
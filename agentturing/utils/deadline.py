@@ -0,0 +1,107 @@
+import time
+import threading
+from typing import Optional, Dict, Any
+
+
+class RequestCancelled(Exception):
+    """Raised at a pipeline checkpoint once the request's deadline passed or its client went away."""
+
+    def __init__(self, reason: str, stage: str = ""):
+        super().__init__(f"request cancelled ({reason}) at {stage or 'unknown stage'}")
+        self.reason = reason
+        self.stage = stage
+
+
+class Deadline:
+    """Per-request time budget plus a cancel flag, shared by every downstream call of one request."""
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.start = time.monotonic()
+        self.expires_at = self.start + timeout if timeout else None
+        self._cancelled = threading.Event()
+        self._reason: Optional[str] = None
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None when the request is unbounded."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def cancel(self, reason: str = "disconnect"):
+        if not self._cancelled.is_set():
+            self._reason = reason
+            self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set() or (self.expires_at is not None and time.monotonic() >= self.expires_at)
+
+    @property
+    def reason(self) -> Optional[str]:
+        if self._cancelled.is_set():
+            return self._reason
+        return "deadline" if self.cancelled else None
+
+    def check(self, stage: str = ""):
+        if self.cancelled:
+            raise RequestCancelled(self.reason, stage)
+
+    def timeout(self, default: float) -> float:
+        """Timeout for a downstream call: ``default`` capped by the time left."""
+        remaining = self.remaining()
+        return default if remaining is None else min(default, remaining)
+
+    def sleep(self, seconds: float) -> bool:
+        """Sleep up to ``seconds`` (bounded by the deadline); returns False if cancelled meanwhile."""
+        remaining = self.remaining()
+        if remaining is not None:
+            seconds = min(seconds, remaining)
+        self._cancelled.wait(seconds)
+        return not self.cancelled
+
+
+class CancellationStats:
+    """Counts cancelled requests and estimates the work they skipped."""
+
+    def __init__(self, alpha: float = 0.1):
+        self._lock = threading.Lock()
+        self.alpha = alpha
+        self.avg_latency: Optional[float] = None
+        self.completed = 0
+        self.cancelled: Dict[str, int] = {}
+        self.stopped_at: Dict[str, int] = {}
+        self.time_saved = 0.0
+
+    def record_completed(self, seconds: float):
+        with self._lock:
+            self.completed += 1
+            if self.avg_latency is None:
+                self.avg_latency = seconds
+            else:
+                self.avg_latency += self.alpha * (seconds - self.avg_latency)
+
+    def record_cancelled(self, reason: str, elapsed: float):
+        with self._lock:
+            self.cancelled[reason] = self.cancelled.get(reason, 0) + 1
+            if self.avg_latency is not None:
+                self.time_saved += max(0.0, self.avg_latency - elapsed)
+
+    def record_stopped(self, stage: str):
+        with self._lock:
+            self.stopped_at[stage] = self.stopped_at.get(stage, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "completed": self.completed,
+                "cancelled": dict(self.cancelled),
+                "stopped_at_stage": dict(self.stopped_at),
+                "avg_latency_s": self.avg_latency,
+                "time_saved_s": round(self.time_saved, 3),
+            }
+
+
+cancellations = CancellationStats()
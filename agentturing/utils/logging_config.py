@@ -1,20 +1,161 @@
-import logging
 import os
-from logging.handlers import RotatingFileHandler
+import copy
+import json
+import time
+import uuid
+import queue
+import atexit
+import random
+import logging
+import contextvars
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.getenv("LOG_FILE", "agentturing.log")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json | text
+# Fraction of DEBUG records kept; INFO and above are never sampled
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.1"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+REQUEST_ID_HEADER = "x-request-id"
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+timings_var = contextvars.ContextVar("stage_timings", default=None)
+
+# Extra attributes copied into JSON records when a log call passes them via ``extra=``
+EXTRA_FIELDS = ("route", "status", "timings", "usage")
+
+_listener = None
+_queue_handler = None
+
+
+class _ContextFilter(logging.Filter):
+    """Stamp records with the current request ID (runs in the caller's thread, before queueing)."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class _DebugSampler(logging.Filter):
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """Never block the caller: drop (and count) records when the queue is full."""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # The stock prepare() folds the traceback into msg; render it into exc_text instead so
+        # formatters still see it separately (JsonFormatter's "exc" field)
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        out = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            out["request_id"] = record.request_id
+        for field in EXTRA_FIELDS:
+            if hasattr(record, field):
+                out[field] = getattr(record, field)
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, default=str)
+
 
 def configure_logging():
-    logger = logging.getLogger()
-    logger.setLevel(LOG_LEVEL)
-    fmt = logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    """
+    Route all records through a bounded queue to a background listener that owns the
+    stream and rotating-file handlers. Safe to call more than once.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+    if LOG_FORMAT == "json":
+        fmt = JsonFormatter()
+    else:
+        fmt = logging.Formatter("%(asctime)s %(levelname)s [%(name)s] [%(request_id)s] %(message)s")
+
     ch = logging.StreamHandler()
     ch.setFormatter(fmt)
-    logger.addHandler(ch)
-
     # optional rotating file
-    fh = RotatingFileHandler("agentturing.log", maxBytes=5_000_000, backupCount=3)
+    fh = RotatingFileHandler(LOG_FILE, maxBytes=5_000_000, backupCount=3)
     fh.setFormatter(fmt)
-    logger.addHandler(fh)
 
-configure_logging()
+    _queue_handler = _DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    _queue_handler.addFilter(_ContextFilter())
+    _queue_handler.addFilter(_DebugSampler(LOG_DEBUG_SAMPLE_RATE))
+
+    logger = logging.getLogger()
+    logger.setLevel(LOG_LEVEL)
+    logger.addHandler(_queue_handler)
+    _listener = QueueListener(_queue_handler.queue, ch, fh, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def dropped_records() -> int:
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Accumulate wall time (ms) for ``stage`` into the current request's timings, if any."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = timings_var.get()
+        if timings is not None:
+            timings[stage] = round(timings.get(stage, 0.0) + (time.perf_counter() - start) * 1000, 1)
+
+
+class RequestIdMiddleware:
+    """ASGI middleware: take X-Request-ID from the client (or mint one), expose it to logs and echo it back."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(REQUEST_ID_HEADER.encode(), b"").decode()[:64] or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(REQUEST_ID_HEADER.encode(), request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
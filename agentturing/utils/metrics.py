@@ -0,0 +1,63 @@
+import logging
+import math
+import threading
+from collections import deque
+from typing import Callable, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+_collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register(name: str, collector: Callable[[], Dict[str, Any]]):
+    """Register a callable whose dict output is exported under ``name`` by /metrics."""
+    _collectors[name] = collector
+
+
+def snapshot() -> Dict[str, Any]:
+    out = {}
+    for name, collector in list(_collectors.items()):
+        try:
+            out[name] = collector()
+        except Exception as e:
+            logger.warning("Metrics collector %s failed: %s", name, e)
+            out[name] = {"error": str(e)}
+    return out
+
+
+class LatencyWindow:
+    """Rolling window of recent latencies (seconds) with percentile lookups."""
+
+    def __init__(self, size: int = 500):
+        self._values = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._values.append(seconds)
+            self.count += 1
+
+    def __len__(self):
+        return len(self._values)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            values = sorted(self._values)
+        if not values:
+            return None
+        idx = min(len(values) - 1, max(0, math.ceil(p / 100.0 * len(values)) - 1))
+        return values[idx]
+
+    def mean(self) -> Optional[float]:
+        with self._lock:
+            values = list(self._values)
+        return sum(values) / len(values) if values else None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
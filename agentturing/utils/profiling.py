@@ -0,0 +1,175 @@
+import os
+import re
+import sys
+import hmac
+import time
+import random
+import logging
+import cProfile
+import threading
+from collections import Counter
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Profiling is off unless an admin token is configured (header trigger) or a sample rate is set
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "cprofile")  # cprofile | stack
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_STACK_INTERVAL_MS = float(os.getenv("PROFILE_STACK_INTERVAL_MS", "5"))
+
+MODES = {"cprofile": ".prof", "stack": ".collapsed"}
+_NAME_RE = re.compile(r"^[\w.-]+\.(prof|collapsed)$")
+
+
+def token_ok(token: Optional[str]) -> bool:
+    return bool(PROFILE_ADMIN_TOKEN) and hmac.compare_digest((token or "").encode(), PROFILE_ADMIN_TOKEN.encode())
+
+
+def _write_text(path: str, text: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+class StackSampler:
+    """Samples one thread's stack via sys._current_frames and counts collapsed (flamegraph) stacks."""
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_STACK_INTERVAL_MS / 1000.0):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            with self._lock:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileStore:
+    """Runs calls under a profiler and keeps the newest ``keep`` profiles in ``directory``."""
+
+    def __init__(self, directory: str = PROFILE_DIR, keep: int = PROFILE_KEEP,
+                 sample_rate: float = PROFILE_SAMPLE_RATE, default_mode: str = PROFILE_MODE):
+        self.directory = directory
+        self.keep = keep
+        self.sample_rate = sample_rate
+        self.default_mode = default_mode if default_mode in MODES else "cprofile"
+        # Only one deterministic profiler may be active per process (enforced on 3.12+)
+        self._cprofile_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.counters = {"requested": 0, "sampled": 0, "saved": 0}
+
+    def choose(self, requested: Optional[str], token: Optional[str]) -> Optional[str]:
+        """
+        Mode for this request: ``requested`` (a header value) with a valid admin token, else the
+        default mode for a sampled fraction of requests, else None. Raises PermissionError for a
+        profiling request without a valid token.
+        """
+        if requested:
+            if not token_ok(token):
+                raise PermissionError("profiling requires a valid admin token")
+            self._incr("requested")
+            return requested if requested in MODES else self.default_mode
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            self._incr("sampled")
+            return self.default_mode
+        return None
+
+    def new_id(self, request_id: Optional[str] = None) -> str:
+        """Profile ID (file stem); the extension depends on the mode that actually ran."""
+        tag = re.sub(r"[^\w-]", "", request_id or "")[:32] or "req"
+        return f"{int(time.time() * 1000)}-{tag}"
+
+    def run(self, mode: str, profile_id: str, fn: Callable, *args, **kwargs) -> Tuple[Any, Optional[str]]:
+        """
+        Call ``fn`` in the current (worker) thread under the profiler and save the profile.
+        Returns ``fn``'s result and the saved file name (None if saving failed); the extension
+        tells which profiler actually ran.
+        """
+        if mode == "cprofile" and self._cprofile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                try:
+                    result = fn(*args, **kwargs)
+                finally:
+                    profiler.disable()
+                    name = self._save(profile_id + MODES["cprofile"], profiler.dump_stats)
+                return result, name
+            finally:
+                self._cprofile_lock.release()
+        # Stack sampling (also used when another request holds cProfile)
+        sampler = StackSampler(threading.get_ident())
+        sampler.start()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            sampler.stop()
+            name = self._save(profile_id + MODES["stack"], lambda path: _write_text(path, sampler.collapsed()))
+        return result, name
+
+    def _save(self, name: str, write: Callable[[str], Any]) -> Optional[str]:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            write(os.path.join(self.directory, name))
+            self._incr("saved")
+            self._prune()
+            return name
+        except OSError as e:
+            logger.warning("Failed to save profile %s: %s", name, e)
+            return None
+
+    def _incr(self, key: str):
+        with self._lock:
+            self.counters[key] += 1
+
+    def _prune(self):
+        names = sorted(n for n in os.listdir(self.directory) if _NAME_RE.match(n))
+        for old in names[:max(0, len(names) - self.keep)]:
+            os.remove(os.path.join(self.directory, old))
+
+    def list(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.directory):
+            return []
+        out = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if _NAME_RE.match(name):
+                st = os.stat(os.path.join(self.directory, name))
+                out.append({"name": name, "bytes": st.st_size, "created": st.st_mtime})
+        return out
+
+    def path(self, name: str) -> Optional[str]:
+        """Filesystem path for a listed profile, or None (rejects anything that is not a bare profile name)."""
+        if not _NAME_RE.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        return dict(counters, sample_rate=self.sample_rate, stored=len(self.list()))
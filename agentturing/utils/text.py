@@ -0,0 +1,13 @@
+import re
+
+SHINGLE_SIZE = 3
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def shingles(text: str, n: int = SHINGLE_SIZE) -> set:
+    """Lowercased word/punctuation n-grams; shared by KB dedup and context packing so both agree on overlap."""
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) <= n:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)}
@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import threading
+import contextvars
+from logging.handlers import RotatingFileHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from agentturing.utils.logging_config import request_id_var
+from agentturing.utils.sanitize import sanitize_output
+
+logger = logging.getLogger(__name__)
+
+# Fraction of /ask and /feedback requests captured (0 = off)
+TRAFFIC_SAMPLE_RATE = float(os.getenv("TRAFFIC_SAMPLE_RATE", "0"))
+TRAFFIC_FILE = os.getenv("TRAFFIC_FILE", "captures/traffic.jsonl")
+TRAFFIC_MAX_BYTES = int(os.getenv("TRAFFIC_MAX_BYTES", "50000000"))
+TRAFFIC_BACKUPS = int(os.getenv("TRAFFIC_BACKUPS", "5"))
+TRAFFIC_QUEUE_SIZE = int(os.getenv("TRAFFIC_QUEUE_SIZE", "10000"))
+CAPTURED_PATHS = {"/ask": "ask", "/feedback": "feedback"}
+
+# The event being captured for the current request (None when the request is not sampled)
+traffic_event_var = contextvars.ContextVar("traffic_event", default=None)
+
+
+def annotate(**fields):
+    """Attach fields (question, route, timings, ...) to the current request's capture, if sampled."""
+    event = traffic_event_var.get()
+    if event is not None:
+        event.update(fields)
+
+
+class _EventFormatter(logging.Formatter):
+    """Serializes an event on the writer thread; PII in the question and answer is redacted there too."""
+
+    def format(self, record):
+        event = record.msg
+        for key in ("question", "answer"):
+            if event.get(key):
+                event[key] = sanitize_output(event[key])
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+
+class TrafficRecorder:
+    """
+    Append-only JSONL capture of sampled requests. Events are queued without blocking (dropped
+    and counted when the queue is full) and written by a background listener to a size-rotated
+    file, so the request path only pays for a dict copy and a ``put_nowait``.
+    """
+
+    def __init__(self, path: str = TRAFFIC_FILE, sample_rate: float = TRAFFIC_SAMPLE_RATE,
+                 max_bytes: int = TRAFFIC_MAX_BYTES, backups: int = TRAFFIC_BACKUPS,
+                 queue_size: int = TRAFFIC_QUEUE_SIZE):
+        self.path = path
+        self.sample_rate = sample_rate
+        self._queue = queue.Queue(queue_size)
+        self._lock = threading.Lock()
+        self.counters = {"captured": 0, "dropped": 0}
+        self._listener = None
+        if sample_rate > 0:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+            handler.setFormatter(_EventFormatter())
+            self._listener = QueueListener(self._queue, handler)
+            self._listener.start()
+            atexit.register(self.close)
+            logger.info("Capturing %.0f%% of traffic to %s", sample_rate * 100, path)
+
+    def sampled(self) -> bool:
+        return self.sample_rate >= 1 or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def record(self, event: Dict[str, Any]):
+        # Copy nested dicts (e.g. timings) so late writes from abandoned workers cannot race the writer
+        event = {k: dict(v) if isinstance(v, dict) else v for k, v in event.items()}
+        try:
+            self._queue.put_nowait(logging.makeLogRecord({"msg": event}))
+            key = "captured"
+        except queue.Full:
+            key = "dropped"
+        with self._lock:
+            self.counters[key] += 1
+
+    def close(self):
+        """Flush queued events and stop the writer."""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counters, sample_rate=self.sample_rate, file=self.path)
+
+
+class TrafficCaptureMiddleware:
+    """
+    ASGI middleware: for a sampled /ask or /feedback request, open an event (arrival time, kind,
+    request ID) that the endpoint fills in via ``annotate``, then record it with the response
+    status and latency once the response has been sent. Unsampled requests pass straight through.
+    """
+
+    def __init__(self, app, recorder: Optional[TrafficRecorder] = None):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope, receive, send):
+        kind = CAPTURED_PATHS.get(scope.get("path")) if scope["type"] == "http" else None
+        if kind is None or self.recorder is None or not self.recorder.sampled():
+            await self.app(scope, receive, send)
+            return
+        event = {"ts": round(time.time(), 3), "kind": kind, "request_id": request_id_var.get()}
+        token = traffic_event_var.set(event)
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                event["status"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            traffic_event_var.reset(token)
+            event.setdefault("status", 500)
+            event["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            self.recorder.record(event)
@@ -1,17 +1,27 @@
 from dotenv import load_dotenv
 load_dotenv()
 import os
+import asyncio
 import logging
-from fastapi import FastAPI, HTTPException, status, Request
-from fastapi.responses import JSONResponse
+import contextvars
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, HTTPException, status, Request, Response
+from fastapi.responses import JSONResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 from pydantic import BaseModel
 from typing import Dict
-from agentturing.utils.logging_config import configure_logging
+from agentturing.utils.logging_config import configure_logging, RequestIdMiddleware, timings_var, dropped_records, request_id_var
 from agentturing.pipelines.main_pipeline import AgentPipeline
 from agentturing.api.schemas import AskRequest, AskResponse, FeedbackRequest
 from agentturing.database.models import Base, Feedback
+from agentturing.utils import metrics
+from agentturing.utils.deadline import Deadline, RequestCancelled, cancellations
+from agentturing.utils.admission import Overloaded, PRIORITIES, DEFAULT_PRIORITY
+from agentturing.utils.profiling import ProfileStore, PROFILE_ADMIN_TOKEN, token_ok
+from agentturing.utils import traffic
+from agentturing.utils.traffic import TrafficRecorder, TrafficCaptureMiddleware
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
@@ -19,6 +29,17 @@ from sqlalchemy.orm import sessionmaker
 configure_logging()
 logger = logging.getLogger(__name__)
 
+# Per-request deadline: X-Request-Timeout-Ms header, else the server default (seconds)
+ASK_DEFAULT_DEADLINE_S = float(os.getenv("ASK_DEFAULT_DEADLINE_S", "60"))
+ASK_MAX_DEADLINE_S = float(os.getenv("ASK_MAX_DEADLINE_S", "300"))
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+DISCONNECT_POLL_S = 0.2
+CLIENT_CLOSED_REQUEST = 499
+PRIORITY_HEADER = "X-Priority"
+# X-Profile: cprofile|stack, honoured only with a valid X-Admin-Token
+PROFILE_HEADER = "X-Profile"
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+
 # DB setup
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./agentturing_feedback.db")
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {})
@@ -33,24 +54,108 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["GET", "POST", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "X-Profile-Id"],
 )
+# Sampled /ask and /feedback capture (TRAFFIC_SAMPLE_RATE); sits inside the request-ID middleware
+traffic_recorder = TrafficRecorder()
+app.add_middleware(TrafficCaptureMiddleware, recorder=traffic_recorder)
+app.add_middleware(RequestIdMiddleware)
 
 pipeline = AgentPipeline()
+metrics.register("cancellation", cancellations.stats)
+metrics.register("logging", lambda: {"dropped_records": dropped_records()})
+profiles = ProfileStore()
+metrics.register("profiling", profiles.stats)
+metrics.register("traffic_capture", traffic_recorder.stats)
+# One thread per request the admission stages can hold, so requests wait in admission queues
+# (which shed with 429) rather than invisibly in the thread pool
+ask_executor = ThreadPoolExecutor(max_workers=pipeline.admission.capacity(), thread_name_prefix="ask")
+
+def _request_deadline(request: Request) -> float:
+    raw = request.headers.get(DEADLINE_HEADER)
+    if raw:
+        try:
+            return min(max(float(raw) / 1000.0, 0.001), ASK_MAX_DEADLINE_S)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid {DEADLINE_HEADER} header")
+    return ASK_DEFAULT_DEADLINE_S
+
+async def _wait_for_disconnect(request: Request):
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_S)
+
+def _drain(task: asyncio.Future):
+    # Abandoned pipeline runs stop at their next checkpoint; record where
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if isinstance(exc, RequestCancelled):
+        cancellations.record_stopped(exc.stage)
+    elif exc is not None:
+        logger.warning("Abandoned ask failed: %s", exc)
 
 @app.post("/ask", response_model=AskResponse)
-async def ask(req: AskRequest):
+async def ask(req: AskRequest, request: Request, response: Response):
     q = req.question.strip()
     if not q:
         raise HTTPException(status_code=400, detail="Question is required")
+    priority = request.headers.get(PRIORITY_HEADER, DEFAULT_PRIORITY).lower()
+    traffic.annotate(question=q, priority=priority)
+    if priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"Invalid {PRIORITY_HEADER} header")
+    try:
+        profile_mode = profiles.choose(request.headers.get(PROFILE_HEADER), request.headers.get(ADMIN_TOKEN_HEADER))
+    except PermissionError:
+        raise HTTPException(status_code=403, detail=f"{PROFILE_HEADER} requires a valid {ADMIN_TOKEN_HEADER}")
+    deadline = Deadline(_request_deadline(request))
+    call = partial(pipeline.ask, q, deadline=deadline, priority=priority)
+    if profile_mode:
+        # Runs inside the worker thread, so the profile covers the pipeline, sanitizers and prompt building
+        call = partial(profiles.run, profile_mode, profiles.new_id(request_id_var.get()), call)
+    # Stage timings are filled in by the pipeline thread (the context, and this dict, are shared with it)
+    timings = {}
+    timings_var.set(timings)
+    traffic.annotate(timings=timings)
+    work = asyncio.get_running_loop().run_in_executor(ask_executor, contextvars.copy_context().run, call)
+    disconnect = asyncio.ensure_future(_wait_for_disconnect(request))
+    done, _ = await asyncio.wait({work, disconnect}, timeout=deadline.remaining(), return_when=asyncio.FIRST_COMPLETED)
+    disconnect.cancel()
+    if work not in done:
+        reason = "disconnect" if disconnect in done else "deadline"
+        deadline.cancel(reason)
+        cancellations.record_cancelled(reason, deadline.elapsed())
+        work.add_done_callback(_drain)
+        if reason == "disconnect":
+            return Response(status_code=CLIENT_CLOSED_REQUEST)
+        raise HTTPException(status_code=504, detail="Request deadline exceeded")
     try:
-        res = pipeline.ask(q)
-        return AskResponse(answer=res["answer"], route=res["route"], sources=res.get("sources", []))
+        res = work.result()
+        profile_name = None
+        if profile_mode:
+            res, profile_name = res
+    except Overloaded as e:
+        logger.warning("Shedding ask: %s", e)
+        return JSONResponse(status_code=429, content={"detail": str(e)},
+                            headers={"Retry-After": str(e.retry_after)})
+    except RequestCancelled as e:
+        cancellations.record_cancelled(e.reason, deadline.elapsed())
+        cancellations.record_stopped(e.stage)
+        raise HTTPException(status_code=504, detail="Request deadline exceeded")
     except Exception as e:
         logger.exception("Error processing ask: %s", e)
         raise HTTPException(status_code=500, detail="Internal error")
+    cancellations.record_completed(deadline.elapsed())
+    timings["total"] = round(deadline.elapsed() * 1000, 1)
+    logger.info("ask completed", extra={"route": res["route"], "timings": timings, "usage": res.get("usage")})
+    traffic.annotate(route=res["route"])
+    if profile_name:
+        # The saved file name, as served by /admin/profiles/{name}
+        response.headers["X-Profile-Id"] = profile_name
+    return AskResponse(answer=res["answer"], route=res["route"], sources=res.get("sources", []), usage=res.get("usage"))
 
 @app.post("/feedback")
 async def feedback(req: FeedbackRequest):
+    traffic.annotate(question=req.question, answer=req.answer, route=req.route, rating=req.rating)
     s = SessionLocal()
     try:
         fb = Feedback(
@@ -74,5 +179,28 @@ async def feedback(req: FeedbackRequest):
 async def health():
     return {"status": "ok"}
 
+@app.get("/metrics")
+async def get_metrics():
+    return metrics.snapshot()
+
+def _require_admin(request: Request):
+    if not PROFILE_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not token_ok(request.headers.get(ADMIN_TOKEN_HEADER)):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.get("/admin/profiles")
+async def list_profiles(request: Request):
+    _require_admin(request)
+    return {"profiles": profiles.list()}
+
+@app.get("/admin/profiles/{name}")
+async def download_profile(name: str, request: Request):
+    _require_admin(request)
+    path = profiles.path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=name, media_type="application/octet-stream")
+
 if __name__ == "__main__":
     uvicorn.run("app:app", host=os.getenv("APP_HOST", "0.0.0.0"), port=int(os.getenv("APP_PORT", 8000)), log_level="info")
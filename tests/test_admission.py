@@ -0,0 +1,36 @@
+import threading
+import time
+import pytest
+from agentturing.utils.admission import AdmissionController, Overloaded
+
+
+def test_sheds_when_queue_full():
+    admission = AdmissionController("llm=1:0")
+    with admission.slot("llm"):
+        with pytest.raises(Overloaded) as exc:
+            with admission.slot("llm"):
+                pass
+    assert exc.value.retry_after >= 1
+    assert admission.stats()["llm"]["shed_full"] == 1
+
+
+def test_interactive_lane_served_before_batch():
+    admission = AdmissionController("llm=1:4")
+    order = []
+    holder = admission.slot("llm")
+    holder.__enter__()
+
+    def worker(priority):
+        with admission.slot("llm", priority):
+            order.append(priority)
+
+    batch = threading.Thread(target=worker, args=("batch",))
+    batch.start()
+    time.sleep(0.05)
+    interactive = threading.Thread(target=worker, args=("interactive",))
+    interactive.start()
+    time.sleep(0.05)
+    holder.__exit__(None, None, None)
+    batch.join()
+    interactive.join()
+    assert order == ["interactive", "batch"]
@@ -11,3 +11,17 @@ def test_health():
 def test_ask_empty():
     r = client.post("/ask", json={"question": ""})
     assert r.status_code == 400
+
+def test_ask_rejects_bad_deadline_header():
+    r = client.post("/ask", json={"question": "2+2"}, headers={"X-Request-Timeout-Ms": "soon"})
+    assert r.status_code == 400
+
+def test_request_id_is_echoed():
+    r = client.get("/health", headers={"X-Request-ID": "abc123"})
+    assert r.headers["X-Request-ID"] == "abc123"
+    assert client.get("/health").headers["X-Request-ID"]
+
+def test_profiling_requires_admin():
+    r = client.post("/ask", json={"question": "2+2"}, headers={"X-Profile": "cprofile"})
+    assert r.status_code == 403
+    assert client.get("/admin/profiles").status_code in (403, 404)
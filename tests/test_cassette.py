@@ -0,0 +1,126 @@
+import time
+import httpx
+import numpy as np
+import pytest
+from agentturing.database.vectorstore import QdrantVectorStore
+from agentturing.llm.scheduler import RateLimited
+from agentturing.mcp.client import MCPClient
+from agentturing.model.llm import LLM
+from agentturing.model.router import LLMRouter
+from agentturing.pipelines.main_pipeline import AgentPipeline
+from agentturing.utils.cassette import Cassette, CassetteMiss
+
+
+class CharEmbedder:
+    """Deterministic 16-dim embeddings so tests need no model download."""
+
+    def encode(self, text):
+        vec = np.zeros(16, dtype=np.float32)
+        for ch in text.lower():
+            vec[ord(ch) % 16] += 1
+        return vec
+
+
+def test_replay_cycles_recordings_and_scales_latency(tmp_path):
+    path = str(tmp_path / "c.jsonl.gz")
+    recorder = Cassette(path, "record")
+    answers = iter(["first", "second"])
+
+    def slow():
+        time.sleep(0.05)
+        return next(answers)
+
+    assert recorder.record("llm", {"prompt": "p"}, slow) == "first"
+    assert recorder.record("llm", {"prompt": "p"}, slow) == "second"
+    with pytest.raises(ZeroDivisionError):
+        recorder.record("llm", {"prompt": "boom"}, lambda: 1 / 0)
+    recorder.close()
+
+    player = Cassette(path, "replay", latency_scale=1.0)
+    start = time.perf_counter()
+    assert [player.replay("llm", {"prompt": "p"}) for _ in range(3)] == ["first", "second", "first"]
+    assert time.perf_counter() - start >= 0.15
+    with pytest.raises(ZeroDivisionError):
+        player.replay("llm", {"prompt": "boom"})
+    with pytest.raises(CassetteMiss):
+        player.replay("mcp", {"prompt": "p"})
+    with pytest.raises(TimeoutError):
+        player.replay("llm", {"prompt": "p"}, max_wait=0.01)
+    assert player.stats()["misses"] == 1
+
+
+def test_replayed_errors_keep_their_type(tmp_path):
+    path = str(tmp_path / "errors.jsonl")
+    recorder = Cassette(path, "record")
+    request = httpx.Request("POST", "http://mcp/tools/websearch")
+    failures = {
+        "limited": RateLimited("no budget"),
+        "slow": TimeoutError("timed out"),
+        "http": httpx.HTTPStatusError("503", request=request, response=httpx.Response(503, request=request)),
+        "custom": type("Odd", (Exception,), {})("odd"),
+    }
+    for name, exc in failures.items():
+        with pytest.raises(type(exc)):
+            recorder.record("llm", {"prompt": name}, lambda exc=exc: (_ for _ in ()).throw(exc))
+    recorder.close()
+
+    player = Cassette(path, "replay")
+    with pytest.raises(RateLimited, match="no budget"):
+        player.replay("llm", {"prompt": "limited"})
+    with pytest.raises(TimeoutError):
+        player.replay("llm", {"prompt": "slow"})
+    with pytest.raises(httpx.HTTPStatusError) as info:
+        player.replay("llm", {"prompt": "http"})
+    assert info.value.response.status_code == 503
+    with pytest.raises(RuntimeError, match="Odd"):
+        player.replay("llm", {"prompt": "custom"})
+
+
+def build_pipeline(cassette, llm, transport):
+    store = QdrantVectorStore(collection="kb", location=":memory:")
+    store.create_versioned_collection(16)
+    store.swap_alias(store.list_versions()[-1])
+    embedder = CharEmbedder()
+    text = "Q: What is 2 + 3?\nA: 5"
+    store.upsert([1], [embedder.encode("What is 2 + 3?").tolist()], [{"source": "add.txt", "text": text}])
+    mcp = MCPClient(url="http://mcp", cassette=cassette)
+    mcp.client = httpx.Client(transport=transport)
+    return AgentPipeline(store=store, llm=LLMRouter({llm.backend: llm}, max_retries=0), mcp=mcp,
+                         embedder=embedder)
+
+
+def test_pipeline_replays_offline(tmp_path, monkeypatch):
+    path = str(tmp_path / "pipeline.jsonl.gz")
+    questions = ["What is 2 + 3?", "Integrate sin(x) dx"]
+
+    # Recording goes through a live backend whose provider call is stubbed, so no API key is needed
+    monkeypatch.setattr("agentturing.model.llm.OPENROUTER_API_KEY", "test")
+    live = LLM(backend="openrouter", model_name="m", cassette=Cassette(path, "record"))
+    monkeypatch.setattr(live, "_generate", lambda prompt, *args: f"answer {len(prompt)}")
+    web = httpx.MockTransport(lambda request: httpx.Response(
+        200, json={"results": [{"title": "t", "snippet": "-cos(x) + C", "url": "https://u"}]}))
+    recorded = build_pipeline(live.cassette, live, web)
+    expected = [recorded.ask(q) for q in questions]
+    assert [r["route"] for r in expected] == ["kb", "mcp"]
+    live.cassette.close()
+
+    def offline(request):
+        raise AssertionError("replay must not touch the network")
+
+    player = Cassette(path, "replay")
+    replayed = build_pipeline(player, LLM(backend="replay", cassette=player), httpx.MockTransport(offline))
+    assert [replayed.ask(q) for q in questions] == expected
+    assert player.stats()["replayed"] == 3 and player.stats()["misses"] == 0
+
+
+def test_recordings_share_one_gzip_member(tmp_path):
+    path = str(tmp_path / "c.jsonl.gz")
+    recorder = Cassette(path, "record")
+    for i in range(20):
+        recorder.record("llm", {"prompt": str(i)}, lambda i=i: f"answer {i}")
+    recorder.close()
+
+    with open(path, "rb") as f:
+        assert f.read().count(b"\x1f\x8b\x08") == 1
+    player = Cassette(path, "replay")
+    assert [player.replay("llm", {"prompt": str(i)}) for i in range(20)] == [f"answer {i}" for i in range(20)]
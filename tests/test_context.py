@@ -0,0 +1,28 @@
+from agentturing.pipelines.context import ContextAssembler
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def test_ranks_by_score_and_dedups_overlap():
+    assembler = ContextAssembler(count_words, budget=100)
+    res = assembler.assemble("q", [
+        {"text": "Solve 2*x + 3 = 7 for x. Answer 2", "source": "a", "score": 0.7},
+        {"text": "Solve 5*y - 1 = 9 for y. Answer 2", "source": "b", "score": 0.9},
+        {"text": "Solve 2*x + 3 = 7 for x. Answer 2.", "source": "c", "score": 0.6},
+    ])
+    assert res["sources"] == ["b", "a"]
+    assert res["usage"]["passages_deduped"] == 1
+
+
+def test_packs_into_budget():
+    assembler = ContextAssembler(count_words, budget=12, min_chunk_tokens=3)
+    res = assembler.assemble("what is x", [
+        {"text": "one two three four five six seven eight", "source": "a", "score": 0.9},
+        {"text": "alpha beta gamma delta epsilon zeta eta theta", "source": "b", "score": 0.8},
+    ])
+    assert res["usage"]["context_tokens"] <= 12
+    assert res["usage"]["question_tokens"] == 3
+    assert res["usage"]["passages_truncated"] == 1
+    assert res["sources"] == ["a", "b"]
@@ -0,0 +1,42 @@
+import time
+import pytest
+from agentturing.utils.deadline import Deadline, RequestCancelled
+
+
+def test_deadline_caps_downstream_timeouts():
+    deadline = Deadline(0.5)
+    assert deadline.timeout(10) <= 0.5
+    assert Deadline().timeout(10) == 10
+
+
+def test_cancel_interrupts_sleep_and_checks():
+    deadline = Deadline(5)
+    deadline.cancel("disconnect")
+    start = time.monotonic()
+    assert deadline.sleep(1.0) is False
+    assert time.monotonic() - start < 0.5
+    with pytest.raises(RequestCancelled) as exc:
+        deadline.check("llm")
+    assert exc.value.reason == "disconnect" and exc.value.stage == "llm"
+
+
+def test_expired_deadline_reports_reason():
+    deadline = Deadline(0.01)
+    time.sleep(0.02)
+    assert deadline.reason == "deadline"
+
+
+def test_stalled_vector_query_is_bounded_client_side():
+    from agentturing.database.vectorstore import QdrantVectorStore
+
+    class StalledClient:
+        def query_points(self, **kwargs):
+            time.sleep(1.0)
+
+    store = QdrantVectorStore(collection="kb", location=":memory:")
+    store.client = StalledClient()
+    deadline = Deadline(0.2)
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        store.query([0.0] * 8, timeout=deadline.timeout(5.0))
+    assert time.monotonic() - start < 0.5
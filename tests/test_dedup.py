@@ -0,0 +1,92 @@
+import re
+import zlib
+import numpy as np
+from agentturing.database.dedup import MinHasher, shingles, deduplicate
+from agentturing.database.setup_knowledgebase import build_version, sync, point_id
+from agentturing.database.vectorstore import QdrantVectorStore
+
+BASE = ("Solve for x: 3*x + 7 = 22. Subtract 7 from both sides to get 3*x = 15, "
+        "then divide both sides by 3. The answer is x = 5.")
+REWORDED = ("Solve for x: 3*x + 7 = 22. Subtract 7 from both sides to get 3*x = 15, "
+            "then divide both sides by 3. So the answer is x = 5.")
+OTHER_NUMBERS = ("Solve for x: 3*x + 8 = 23. Subtract 8 from both sides to get 3*x = 15, "
+                 "then divide both sides by 3. The answer is x = 5.")
+UNRELATED = "Find the area of a circle with radius 2. The area is 4*pi."
+
+
+class BagOfWordsEmbedder:
+    def get_sentence_embedding_dimension(self):
+        return 64
+
+    def encode(self, texts):
+        out = np.zeros((len(texts), 64), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in re.findall(r"[a-z]+", text.lower()):
+                out[i, zlib.crc32(word.encode()) % 64] += 1
+        return out
+
+
+def test_minhash_estimates_jaccard():
+    a, b = shingles(BASE), shingles(REWORDED)
+    exact = len(a & b) / len(a | b)
+    hasher = MinHasher(num_perm=256)
+    estimate = np.mean(hasher.signature(a) == hasher.signature(b))
+    assert abs(estimate - exact) < 0.1
+
+
+def test_near_duplicates_merge_but_different_numbers_do_not():
+    texts = [BASE, REWORDED, OTHER_NUMBERS, UNRELATED]
+    vectors = BagOfWordsEmbedder().encode(texts)
+    report = deduplicate(["a", "b", "c", "d"], texts, vectors)
+    assert report["keep"] == [0, 2, 3]
+    assert report["also_in"] == {"a": ["b"]}
+    assert (report["before"], report["after"]) == (4, 3)
+
+
+def test_build_merges_duplicates_and_sync_restores_orphans(tmp_path):
+    kb, passages = tmp_path / "kb", tmp_path / "passages"
+    kb.mkdir()
+    for name, text in (("a.txt", BASE), ("b.txt", REWORDED), ("c.txt", UNRELATED)):
+        kb.joinpath(name).write_text(text, encoding="utf-8")
+    store = QdrantVectorStore(collection="kb", location=":memory:")
+    stats = build_version(store, BagOfWordsEmbedder(), str(kb), passages_dir=str(passages))
+    assert stats["deduplicated"] == 1
+    assert store.client.count("kb").count == 2
+    assert store.manifest()["b.txt"] == {"id": point_id("a.txt"), "hash": store.manifest()["b.txt"]["hash"],
+                                         "alias": True}
+    assert sync(store, BagOfWordsEmbedder(), str(kb), passages_dir=str(passages))["upserted"] == 0
+
+    # Deleting the kept file must not lose its merged duplicate
+    kb.joinpath("a.txt").unlink()
+    stats = sync(store, BagOfWordsEmbedder(), str(kb), passages_dir=str(passages))
+    assert (stats["upserted"], stats["deleted"]) == (1, 1)
+    assert set(store.manifest()) == {"b.txt", "c.txt"}
+    assert store.manifest()["b.txt"]["id"] == point_id("b.txt")
+
+
+def test_sync_prunes_also_in_of_deleted_or_edited_duplicates(tmp_path):
+    kb, passages = tmp_path / "kb", tmp_path / "passages"
+    kb.mkdir()
+    for name, text in (("a.txt", BASE), ("b.txt", REWORDED), ("c.txt", UNRELATED)):
+        kb.joinpath(name).write_text(text, encoding="utf-8")
+    store = QdrantVectorStore(collection="kb", location=":memory:")
+    build_version(store, BagOfWordsEmbedder(), str(kb), passages_dir=str(passages))
+
+    def also_in():
+        return store.client.retrieve("kb", [point_id("a.txt")])[0].payload.get("also_in")
+
+    assert set(also_in()) == {"b.txt"}
+    kb.joinpath("b.txt").unlink()
+    stats = sync(store, BagOfWordsEmbedder(), str(kb), passages_dir=str(passages))
+    assert (stats["upserted"], stats["deleted"]) == (0, 0)
+    assert also_in() == {}
+    assert set(store.manifest()) == {"a.txt", "c.txt"}
+
+    # An edited duplicate gets its own point and leaves the representative's also_in
+    store = QdrantVectorStore(collection="kb", location=":memory:")
+    kb.joinpath("b.txt").write_text(REWORDED, encoding="utf-8")
+    build_version(store, BagOfWordsEmbedder(), str(kb), passages_dir=str(passages))
+    kb.joinpath("b.txt").write_text(UNRELATED + " Also 7.", encoding="utf-8")
+    assert sync(store, BagOfWordsEmbedder(), str(kb), passages_dir=str(passages))["upserted"] == 1
+    assert also_in() == {}
+    assert store.manifest()["b.txt"]["id"] == point_id("b.txt")
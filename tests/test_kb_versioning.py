@@ -0,0 +1,84 @@
+import numpy as np
+from qdrant_client.http import models as qmodels
+from agentturing.database.vectorstore import QdrantVectorStore
+from agentturing.database.setup_knowledgebase import build_version, sync, point_id
+from agentturing.database.passage_store import payload_text
+
+
+class HashEmbedder:
+    """Deterministic 8-dim embeddings so tests need no model download."""
+
+    def get_sentence_embedding_dimension(self):
+        return 8
+
+    def encode(self, texts):
+        return np.array([[(hash(t) >> i) % 7 + 1 for i in range(8)] for t in texts], dtype=np.float32)
+
+
+def write(kb, name, text):
+    kb.joinpath(name).write_text(text, encoding="utf-8")
+
+
+def test_rebuild_swaps_alias_and_prunes_old_versions(tmp_path):
+    write(tmp_path, "a.txt", "Q: 1+1")
+    store = QdrantVectorStore(collection="kb", location=":memory:")
+    first = build_version(store, HashEmbedder(), str(tmp_path), passages_dir=str(tmp_path / "passages"))["collection"]
+    assert store.alias_target() == first
+    second = build_version(store, HashEmbedder(), str(tmp_path), keep=1, passages_dir=str(tmp_path / "passages"))["collection"]
+    third = build_version(store, HashEmbedder(), str(tmp_path), keep=1, passages_dir=str(tmp_path / "passages"))["collection"]
+    assert store.alias_target() == third
+    assert store.list_versions() == [second, third]
+    assert store.client.count("kb").count == 1
+
+
+def test_sync_applies_only_the_delta(tmp_path):
+    write(tmp_path, "a.txt", "Q: 1+1")
+    write(tmp_path, "b.txt", "Q: 2+2")
+    store = QdrantVectorStore(collection="kb", location=":memory:")
+    build_version(store, HashEmbedder(), str(tmp_path), passages_dir=str(tmp_path / "passages"))
+    assert sync(store, HashEmbedder(), str(tmp_path), passages_dir=str(tmp_path / "passages"))["upserted"] == 0
+
+    write(tmp_path, "b.txt", "Q: 2+3")
+    write(tmp_path, "c.txt", "Q: 3+3")
+    tmp_path.joinpath("a.txt").unlink()
+    stats = sync(store, HashEmbedder(), str(tmp_path), passages_dir=str(tmp_path / "passages"))
+    assert (stats["upserted"], stats["deleted"]) == (2, 1)
+    manifest = store.manifest()
+    assert set(manifest) == {"b.txt", "c.txt"}
+    assert manifest["b.txt"]["id"] == point_id("b.txt")
+
+
+def test_concrete_collection_is_migrated_to_alias(tmp_path):
+    write(tmp_path, "a.txt", "Q: 1+1")
+    store = QdrantVectorStore(collection="kb", location=":memory:")
+    store.client.create_collection("kb", vectors_config=qmodels.VectorParams(size=8, distance=qmodels.Distance.COSINE))
+    target = build_version(store, HashEmbedder(), str(tmp_path), passages_dir=str(tmp_path / "passages"))["collection"]
+    assert store.alias_target() == target
+
+
+def test_payloads_are_slim_and_old_passage_stores_are_pruned(tmp_path):
+    kb, passages = tmp_path / "kb", tmp_path / "passages"
+    kb.mkdir()
+    write(kb, "a.txt", "Q: 1+1\nA: 2")
+    store = QdrantVectorStore(collection="kb", location=":memory:")
+    first = build_version(store, HashEmbedder(), str(kb), keep=0, passages_dir=str(passages))["collection"]
+    point = store.client.scroll("kb", limit=1)[0][0]
+    assert "text" not in point.payload
+    assert payload_text(point.payload, str(passages)) == "Q: 1+1\nA: 2"
+    second = build_version(store, HashEmbedder(), str(kb), keep=0, passages_dir=str(passages))["collection"]
+    assert first != second
+    assert [p.stem for p in passages.glob("*.idx")] == [second]
+
+
+def test_build_and_sync_across_shards(tmp_path):
+    from agentturing.database.sharded_store import ShardedVectorStore
+    kb, passages = tmp_path / "kb", tmp_path / "passages"
+    kb.mkdir()
+    for i in range(6):
+        write(kb, f"{i}.txt", f"Q: {i}+{i}")
+    store = ShardedVectorStore([QdrantVectorStore(collection="kb", location=":memory:") for _ in range(2)])
+    target = build_version(store, HashEmbedder(), str(kb), passages_dir=str(passages))["collection"]
+    assert [s.alias_target() for s in store.shards] == [target, target]
+    assert len(store.manifest()) == 6
+    kb.joinpath("0.txt").unlink()
+    assert sync(store, HashEmbedder(), str(kb), passages_dir=str(passages))["deleted"] == 1
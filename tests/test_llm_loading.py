@@ -0,0 +1,33 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from agentturing.model.loading import load_causal_lm
+
+
+@pytest.fixture(scope="module")
+def tiny_model_dir(tmp_path_factory):
+    config = transformers.Qwen2Config(vocab_size=512, hidden_size=64, intermediate_size=128, num_hidden_layers=2,
+                                      num_attention_heads=4, num_key_value_heads=2)
+    path = tmp_path_factory.mktemp("tinylm")
+    transformers.Qwen2ForCausalLM(config).save_pretrained(str(path))
+    return str(path)
+
+
+@pytest.mark.parametrize("mode", ["bf16", "int8"])
+def test_load_modes_report_and_generate(tiny_model_dir, mode):
+    model, report = load_causal_lm(tiny_model_dir, mode)
+    assert report["mode"] == mode
+    assert report["load_s"] >= 0 and report["peak_rss_mb"] >= report["rss_before_mb"] > 0
+    out = model.generate(input_ids=torch.tensor([[1, 2, 3]]), max_new_tokens=2, do_sample=False)
+    assert out.shape[1] == 5
+    if mode == "bf16":
+        assert next(model.parameters()).dtype == torch.bfloat16
+    else:
+        assert any(isinstance(m, torch.ao.nn.quantized.dynamic.Linear) for m in model.modules())
+
+
+def test_unknown_mode_is_rejected(tiny_model_dir):
+    with pytest.raises(ValueError):
+        load_causal_lm(tiny_model_dir, "fp8")
@@ -0,0 +1,118 @@
+import time
+import pytest
+from agentturing.model.router import LLMRouter
+from agentturing.llm.scheduler import RateLimited
+
+
+class FakeBackend:
+    def __init__(self, answer, delay=0.0, fail=False):
+        self.answer = answer
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    def count_tokens(self, text):
+        return len(text.split())
+
+    def generate(self, prompt, max_tokens=256, temperature=0.0, timeout=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise self.fail if isinstance(self.fail, Exception) else RuntimeError("boom")
+        return self.answer
+
+
+def test_retries_then_fails_over():
+    primary, secondary = FakeBackend("a", fail=True), FakeBackend("b")
+    router = LLMRouter({"gemini": primary, "openrouter": secondary}, max_retries=1, backoff_base=0.0)
+    assert router.generate("q") == "b"
+    assert primary.calls == 2
+    stats = router.stats()
+    assert stats["gemini"]["retries"] == 1
+    assert stats["openrouter"]["served"] == 1
+
+
+def test_timeout_counts_against_backend():
+    router = LLMRouter({"gemini": FakeBackend("a", delay=0.3)}, max_retries=0, timeouts={"gemini": 0.05})
+    with pytest.raises(RuntimeError):
+        router.generate("q")
+    assert router.stats()["gemini"]["timeouts"] == 1
+
+
+def test_hedges_to_second_backend_past_p95():
+    slow, fast = FakeBackend("slow"), FakeBackend("fast")
+    router = LLMRouter({"gemini": slow, "openrouter": fast}, hedge=True, hedge_min_samples=3)
+    for _ in range(3):
+        router.generate("warm")
+    slow.delay = 0.5
+    assert router.generate("q") == "fast"
+    assert router.stats()["openrouter"]["hedge_wins"] == 1
+
+
+def test_rate_limited_probe_does_not_wedge_half_open_breaker():
+    backend = FakeBackend("ok", fail=True)
+    router = LLMRouter({"gemini": backend}, max_retries=0, backoff_base=0.0)
+    breaker = router.backends[0].breaker
+    breaker.cooldown = 0.0
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(RuntimeError):
+            router.generate("q")
+    assert breaker.state == "half_open"
+
+    backend.fail = RateLimited("budget exhausted")
+    with pytest.raises(RuntimeError):
+        router.generate("q")
+    assert router.stats()["gemini"]["rate_limited"] == 1
+
+    backend.fail = False
+    assert router.generate("q") == "ok"
+    assert breaker.state == "closed"
+
+
+def test_late_results_do_not_reset_an_open_breaker():
+    backend = FakeBackend("late", delay=0.2)
+    router = LLMRouter({"gemini": backend}, max_retries=0, timeouts={"gemini": 0.02})
+    breaker = router.backends[0].breaker
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(RuntimeError):
+            router.generate("q")
+    assert breaker.state == "open"
+
+    time.sleep(0.3)
+    stats = router.stats()["gemini"]
+    assert breaker.state == "open"
+    assert (stats["timeouts"], stats["successes"], stats["late"]) == (3, 0, 3)
+
+
+def test_abandoned_call_that_times_out_itself_counts_once():
+    class SelfTimingOut(FakeBackend):
+        def generate(self, prompt, max_tokens=256, temperature=0.0, timeout=None):
+            self.calls += 1
+            time.sleep(timeout + 0.05)
+            raise TimeoutError("read timed out")
+
+    router = LLMRouter({"gemini": SelfTimingOut("x")}, max_retries=0, timeouts={"gemini": 0.02})
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            router.generate("q")
+    time.sleep(0.1)
+    stats = router.stats()["gemini"]
+    assert (stats["timeouts"], stats["failures"], stats["late"]) == (2, 0, 2)
+    assert router.backends[0].breaker.state == "closed"
+
+
+def test_uninterruptible_backend_is_not_retried_after_timeout():
+    local, api = FakeBackend("local", delay=0.2), FakeBackend("api")
+    local.interruptible = False
+    router = LLMRouter({"transformers": local, "openrouter": api}, max_retries=2, backoff_base=0.0,
+                       timeouts={"transformers": 0.02})
+    assert router.generate("q") == "api"
+    assert local.calls == 1
+
+
+def test_rate_limited_backend_fails_over_without_retrying():
+    limited, other = FakeBackend("a", fail=RateLimited("budget exhausted")), FakeBackend("b")
+    router = LLMRouter({"gemini": limited, "openrouter": other}, max_retries=2, backoff_base=10.0)
+    start = time.perf_counter()
+    assert router.generate("q") == "b"
+    assert limited.calls == 1 and time.perf_counter() - start < 1.0
@@ -0,0 +1,62 @@
+import sys
+import queue
+import json
+import logging
+from agentturing.utils import logging_config
+from agentturing.utils.logging_config import JsonFormatter, request_id_var, stage_timer, timings_var
+
+
+def test_configure_logging_is_idempotent():
+    logging_config.configure_logging()
+    logging_config.configure_logging()
+    root = logging.getLogger()
+    queued = [h for h in root.handlers if isinstance(h, logging_config._DroppingQueueHandler)]
+    assert len(queued) == 1
+
+
+def test_json_records_carry_request_id_and_timings():
+    token = request_id_var.set("req-123")
+    try:
+        record = logging.LogRecord("agent", logging.INFO, __file__, 1, "ask %s", ("completed",), None)
+        logging_config._ContextFilter().filter(record)
+        record.timings = {"llm": 12.5}
+    finally:
+        request_id_var.reset(token)
+    out = json.loads(JsonFormatter().format(record))
+    assert out["msg"] == "ask completed"
+    assert out["request_id"] == "req-123"
+    assert out["timings"] == {"llm": 12.5}
+
+
+def test_stage_timer_accumulates_into_request_timings():
+    timings = {}
+    token = timings_var.set(timings)
+    try:
+        with stage_timer("retrieve"):
+            pass
+        with stage_timer("retrieve"):
+            pass
+    finally:
+        timings_var.reset(token)
+    assert set(timings) == {"retrieve"} and timings["retrieve"] >= 0
+
+
+def test_debug_records_are_sampled():
+    drop_all = logging_config._DebugSampler(0.0)
+    debug = logging.LogRecord("agent", logging.DEBUG, __file__, 1, "noisy", None, None)
+    info = logging.LogRecord("agent", logging.INFO, __file__, 1, "kept", None, None)
+    assert not drop_all.filter(debug)
+    assert drop_all.filter(info)
+
+
+def test_queued_exceptions_keep_a_separate_exc_field():
+    handler = logging_config._DroppingQueueHandler(queue.Queue())
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        record = logging.LogRecord("agent", logging.ERROR, __file__, 1, "failed %s", ("ask",), sys.exc_info())
+    out = json.loads(JsonFormatter().format(handler.prepare(record)))
+    assert out["msg"] == "failed ask"
+    assert "ZeroDivisionError" in out["exc"] and "Traceback" not in out["msg"]
+    text = logging.Formatter("%(message)s").format(handler.prepare(record))
+    assert text.startswith("failed ask\nTraceback")
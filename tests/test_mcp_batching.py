@@ -0,0 +1,50 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from agentturing.mcp.batching import EncodeBatcher
+
+
+def test_concurrent_encodes_share_one_batch():
+    seen = []
+
+    def encode_batch(texts):
+        seen.append(list(texts))
+        return [[len(t)] for t in texts]
+
+    async def main():
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            batcher = EncodeBatcher(encode_batch, executor, asyncio.Semaphore(4), max_batch=8, max_wait=0.01)
+            return await asyncio.gather(*(batcher.encode("x" * n) for n in range(1, 6)))
+
+    out = asyncio.run(main())
+    assert out == [[1], [2], [3], [4], [5]]
+    assert seen == [["x", "xx", "xxx", "xxxx", "xxxxx"]]
+
+
+def test_batch_flushes_at_max_size():
+    seen = []
+
+    def encode_batch(texts):
+        seen.append(len(texts))
+        return texts
+
+    async def main():
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            batcher = EncodeBatcher(encode_batch, executor, asyncio.Semaphore(4), max_batch=2, max_wait=1.0)
+            return await asyncio.gather(*(batcher.encode(str(n)) for n in range(4)))
+
+    assert asyncio.run(main()) == ["0", "1", "2", "3"]
+    assert seen == [2, 2]
+
+
+def test_running_batches_are_held_until_done():
+    async def main():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            batcher = EncodeBatcher(lambda texts: texts, executor, asyncio.Semaphore(1), max_batch=1)
+            pending = asyncio.ensure_future(batcher.encode("a"))
+            await asyncio.sleep(0)
+            in_flight = len(batcher._tasks)
+            result = await pending
+            await asyncio.sleep(0)
+            return in_flight, result, len(batcher._tasks)
+
+    assert asyncio.run(main()) == (1, "a", 0)
@@ -0,0 +1,55 @@
+import httpx
+from agentturing.mcp.client import MCPClient
+
+
+def make_client(handler):
+    mcp = MCPClient(url="http://mcp")
+    mcp.client = httpx.Client(transport=httpx.MockTransport(handler))
+    return mcp
+
+
+def test_results_cached_by_normalized_query():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"results": [{"title": "t", "snippet": "s", "url": "u"}]})
+
+    mcp = make_client(handler)
+    mcp.web_search("Solve x + 1 = 2?")
+    res = mcp.web_search("  solve X + 1 = 2 ")
+    assert res["results"][0]["url"] == "u"
+    assert len(calls) == 1
+    assert mcp.stats()["hit_rate"] == 0.5
+
+
+def test_breaker_opens_after_empty_responses():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"results": []})
+
+    mcp = make_client(handler)
+    for i in range(5):
+        mcp.web_search(f"question {i}")
+    assert len(calls) == 3
+    stats = mcp.stats()
+    assert stats["breaker"] == "open"
+    assert stats["skipped_open"] == 2
+
+
+def test_deadline_capped_timeouts_do_not_trip_breaker():
+    def handler(request):
+        raise httpx.ReadTimeout("slow", request=request)
+
+    mcp = make_client(handler)
+    for i in range(5):
+        assert mcp.web_search(f"question {i}", timeout=0.01, timeout_capped=True) == {"results": []}
+    stats = mcp.stats()
+    assert stats["breaker"] == "closed"
+    assert stats["deadline_timeouts"] == 5 and stats["failures"] == 0
+
+    for i in range(3):
+        mcp.web_search(f"other {i}", timeout=0.01)
+    assert mcp.stats()["breaker"] == "open"
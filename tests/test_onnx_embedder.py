@@ -0,0 +1,58 @@
+import json
+import os
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+transformers = pytest.importorskip("transformers")
+sentence_transformers = pytest.importorskip("sentence_transformers")
+
+from agentturing.model import onnx_embedder
+from agentturing.model.embeddings import load_embedder
+
+SENTENCES = ["what is 2+2", "solve 3*x = 9 for x", "x"]
+
+
+@pytest.fixture(scope="module")
+def tiny_st_dir(tmp_path_factory):
+    from sentence_transformers import SentenceTransformer, models
+
+    root = tmp_path_factory.mktemp("tinyst")
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "what", "is", "solve", "for"] + \
+        list("abcdefghijklmnopqrstuvwxyz0123456789+-*/=()")
+    (root / "vocab.txt").write_text("\n".join(vocab))
+    config = transformers.BertConfig(vocab_size=len(vocab), hidden_size=32, num_hidden_layers=2,
+                                     num_attention_heads=2, intermediate_size=64, max_position_embeddings=64)
+    transformers.BertModel(config).save_pretrained(str(root / "bert"))
+    transformers.BertTokenizerFast(str(root / "vocab.txt")).save_pretrained(str(root / "bert"))
+    st = SentenceTransformer(modules=[models.Transformer(str(root / "bert"), max_seq_length=32),
+                                      models.Pooling(32, "mean"), models.Normalize()])
+    st.save(str(root / "st"))
+    return str(root / "st")
+
+
+@pytest.fixture
+def onnx_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(onnx_embedder, "EMBEDDING_ONNX_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.parametrize("backend,min_cosine", [("onnx", 0.9999), ("onnx-int8", 0.99)])
+def test_onnx_embeddings_match_torch(tiny_st_dir, onnx_dir, backend, min_cosine):
+    reference = load_embedder(tiny_st_dir, backend="torch")
+    embedder = load_embedder(tiny_st_dir, backend=backend)
+    expected, got = reference.encode(SENTENCES), embedder.encode(SENTENCES)
+
+    assert got.shape == expected.shape and got.dtype == np.float32
+    assert (np.sum(got * expected, axis=1) >= min_cosine).all()
+
+
+def test_onnx_embedder_keeps_the_sentence_transformer_interface(tiny_st_dir, onnx_dir):
+    reference = load_embedder(tiny_st_dir, backend="torch")
+    embedder = load_embedder(tiny_st_dir, backend="onnx")
+
+    assert embedder.get_sentence_embedding_dimension() == reference.get_sentence_embedding_dimension()
+    assert embedder.encode("x").shape == reference.encode("x").shape
+    assert embedder.encode(SENTENCES, batch_size=2).shape == (len(SENTENCES), 32)
+    with open(os.path.join(onnx_embedder.onnx_dir_for(tiny_st_dir), onnx_embedder.POOLING_FILE)) as f:
+        assert json.load(f) == {"pooling": "mean", "normalize": True, "max_seq_length": 32, "dimension": 32}
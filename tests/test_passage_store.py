@@ -0,0 +1,37 @@
+from agentturing.database import passage_store
+from agentturing.database.passage_store import PassageStore, evict_store, get_store, payload_text
+
+
+def test_append_and_zero_copy_read(tmp_path):
+    writer = PassageStore("kb_v1", str(tmp_path))
+    assert writer.append(["x² + 1", "", "second"]) == [0, 1, 2]
+    reader = PassageStore("kb_v1", str(tmp_path))
+    assert isinstance(reader.get(0), memoryview)
+    assert reader.text(0) == "x² + 1"
+    assert reader.text(1) == ""
+    # Appends made after the reader mapped the files become visible
+    assert writer.append(["third"]) == [3]
+    assert reader.text(3) == "third"
+    assert len(reader) == 4
+
+
+def test_payload_text_prefers_store_and_falls_back_to_inline(tmp_path):
+    PassageStore("kb_v1", str(tmp_path)).append(["from store"])
+    assert payload_text({"pid": 0, "store": "kb_v1", "text": "inline"}, str(tmp_path)) == "from store"
+    assert payload_text({"pid": 5, "store": "kb_v1", "text": "inline"}, str(tmp_path)) == "inline"
+    assert payload_text({"text": "legacy"}, str(tmp_path)) == "legacy"
+
+
+def test_reader_cache_closes_superseded_versions(tmp_path, monkeypatch):
+    monkeypatch.setattr(passage_store, "PASSAGE_STORE_CACHE", 2)
+    monkeypatch.setattr(passage_store, "_stores", passage_store.OrderedDict())
+    readers = []
+    for version in range(3):
+        PassageStore(f"kb_v{version}", str(tmp_path)).append([f"text {version}"])
+        readers.append(get_store(f"kb_v{version}", str(tmp_path)))
+        assert readers[-1].text(0) == f"text {version}"
+
+    assert readers[0]._index is None and readers[1]._index is not None
+    assert list(passage_store._stores) == [str(tmp_path / "kb_v1"), str(tmp_path / "kb_v2")]
+    evict_store("kb_v1", str(tmp_path))
+    assert readers[1]._index is None and len(passage_store._stores) == 1
@@ -0,0 +1,54 @@
+import time
+import pstats
+import pytest
+from agentturing.utils import profiling
+from agentturing.utils.profiling import ProfileStore
+
+
+def busy_work():
+    end = time.perf_counter() + 0.05
+    while time.perf_counter() < end:
+        sum(range(100))
+    return "done"
+
+
+def test_header_trigger_requires_admin_token(monkeypatch):
+    store = ProfileStore(sample_rate=0)
+    monkeypatch.setattr(profiling, "PROFILE_ADMIN_TOKEN", "")
+    with pytest.raises(PermissionError):
+        store.choose("cprofile", "anything")
+    monkeypatch.setattr(profiling, "PROFILE_ADMIN_TOKEN", "s3cret")
+    with pytest.raises(PermissionError):
+        store.choose("stack", "wrong")
+    assert store.choose("stack", "s3cret") == "stack"
+    assert store.choose(None, None) is None
+    assert ProfileStore(sample_rate=1.0, default_mode="stack").choose(None, None) == "stack"
+
+
+def test_cprofile_and_stack_profiles_are_saved(tmp_path):
+    store = ProfileStore(directory=str(tmp_path))
+    assert store.run("cprofile", "1-a", busy_work) == ("done", "1-a.prof")
+    stats = pstats.Stats(str(tmp_path / "1-a.prof"))
+    assert any(func[2] == "busy_work" for func in stats.stats)
+
+    assert store.run("stack", "2-b", busy_work) == ("done", "2-b.collapsed")
+    collapsed = (tmp_path / "2-b.collapsed").read_text()
+    assert "test_profiling.py:busy_work" in collapsed
+    assert collapsed.splitlines()[0].rsplit(" ", 1)[1].isdigit()
+
+
+def test_listing_prunes_and_rejects_traversal(tmp_path):
+    store = ProfileStore(directory=str(tmp_path), keep=2)
+    for i in range(3):
+        store.run("stack", f"{i}-r", lambda: None)
+    assert [p["name"] for p in store.list()] == ["2-r.collapsed", "1-r.collapsed"]
+    assert store.path("1-r.collapsed")
+    assert store.path("../app.py") is None
+    assert store.path("0-r.collapsed") is None
+
+
+def test_busy_cprofile_falls_back_to_a_stack_profile_name(tmp_path):
+    store = ProfileStore(directory=str(tmp_path))
+    with store._cprofile_lock:
+        assert store.run("cprofile", "3-c", busy_work) == ("done", "3-c.collapsed")
+    assert store.path("3-c.collapsed") and store.stats()["saved"] == 1
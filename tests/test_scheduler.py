@@ -0,0 +1,56 @@
+import asyncio
+import time
+import pytest
+from agentturing.llm.scheduler import ProviderScheduler, RateLimited, parse_duration
+
+
+def test_request_budget_smooths_bursts():
+    sched = ProviderScheduler("test", rpm=120)  # 2 req/s, burst of 120
+    sched.requests.level = 1
+    assert sched.acquire() < 0.05
+    waited = sched.acquire()
+    assert 0.3 < waited < 0.8
+    assert sched.stats()["granted"] == 2
+
+
+def test_times_out_when_budget_unavailable():
+    sched = ProviderScheduler("test", rpm=60, tpm=600)
+    sched.tokens.level = 0
+    with pytest.raises(RateLimited):
+        sched.acquire(tokens=300, timeout=0.1)
+    assert sched.stats()["queue_depth"] == 0
+
+
+def test_adapts_to_rate_limit_headers():
+    sched = ProviderScheduler("test", rpm=20)
+    reset_ms = str(int((time.time() + 2) * 1000))
+    sched.update_from_headers({"X-RateLimit-Limit": "10", "X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset_ms})
+    stats = sched.stats()
+    assert stats["rpm"] == 10
+    assert 1.0 < stats["paused_for_s"] <= 2.0
+
+
+def test_parse_duration():
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("200ms") == pytest.approx(0.2)
+    assert parse_duration("1.5") == 1.5
+
+
+def test_cancelled_async_wait_leaves_the_queue():
+    sched = ProviderScheduler("test", rpm=60, tpm=600)
+    sched.tokens.level = 0
+
+    async def cancel_waiter():
+        waiter = asyncio.ensure_future(sched.acquire_async(tokens=300))
+        await asyncio.sleep(0.1)
+        assert sched.stats()["queue_depth"] == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(cancel_waiter())
+    deadline = time.monotonic() + 1.0
+    while sched.stats()["queue_depth"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sched.stats()["queue_depth"] == 0 and sched.stats()["cancelled"] == 1
+    assert sched.acquire(timeout=0.1) < 0.05
@@ -0,0 +1,81 @@
+import time
+import numpy as np
+import pytest
+from qdrant_client.http import models as qmodels
+from agentturing.database.vectorstore import QdrantVectorStore
+from agentturing.database.sharded_store import ShardedVectorStore, shard_index
+
+
+def memory_store():
+    store = QdrantVectorStore(collection="kb", location=":memory:")
+    store.client.create_collection("kb", vectors_config=qmodels.VectorParams(size=8, distance=qmodels.Distance.COSINE))
+    return store
+
+
+def fill(store, n=40):
+    rng = np.random.default_rng(0)
+    vecs = rng.normal(size=(n, 8)).tolist()
+    store.upsert(list(range(1, n + 1)), vecs, [{"source": f"doc{i}"} for i in range(1, n + 1)])
+    return vecs
+
+
+def test_scatter_gather_matches_single_store():
+    single, sharded = memory_store(), ShardedVectorStore([memory_store() for _ in range(3)])
+    vecs = fill(single)
+    fill(sharded)
+    assert all(s.client.count("kb").count > 0 for s in sharded.shards)
+    assert sum(s.client.count("kb").count for s in sharded.shards) == len(vecs)
+    for q in vecs[:5]:
+        expected = [h.id for h in single.query(q, top_k=4)]
+        assert [h.id for h in sharded.query(q, top_k=4)] == expected
+
+
+def test_partitioning_is_stable():
+    assert shard_index("abc", 4) == shard_index("abc", 4)
+    assert {shard_index(i, 4) for i in range(100)} == {0, 1, 2, 3}
+
+
+class SlowShard:
+    collection = "kb"
+
+    def __init__(self, delay=None, error=None):
+        self.delay, self.error = delay, error
+
+    def query(self, embedding, top_k=5, timeout=None):
+        if self.error:
+            raise self.error
+        time.sleep(self.delay)
+        return []
+
+
+def test_slow_or_failing_shard_yields_partial_results():
+    healthy = memory_store()
+    vecs = fill(healthy)
+    sharded = ShardedVectorStore([healthy, SlowShard(delay=1.0), SlowShard(error=ConnectionError("down"))], timeout=5)
+    start = time.monotonic()
+    hits = sharded.query(vecs[0], top_k=3, timeout=0.2)
+    assert time.monotonic() - start < 0.5
+    assert hits[0].id == 1
+    stats = sharded.stats()
+    assert stats["partial"] == 1 and stats["shard_timeouts"] == 1 and stats["shard_errors"] == 1
+
+
+def test_no_shard_answering_raises():
+    sharded = ShardedVectorStore([SlowShard(delay=0.5)])
+    with pytest.raises(TimeoutError):
+        sharded.query([0.0] * 8, timeout=0.05)
+
+
+def test_saturated_shard_is_skipped_not_queued():
+    healthy = memory_store()
+    vecs = fill(healthy)
+    sharded = ShardedVectorStore([healthy, SlowShard(delay=0.5)], max_inflight=1)
+    sharded.query(vecs[0], top_k=3, timeout=0.05)  # leaves a straggler on the slow shard
+    start = time.monotonic()
+    hits = sharded.query(vecs[0], top_k=3, timeout=1.0)
+    assert time.monotonic() - start < 0.3
+    assert hits[0].id == 1
+    assert sharded.stats()["shard_saturated"] == 1
+    time.sleep(0.5)
+    sharded.query(vecs[0], top_k=3, timeout=1.0)
+    assert sharded.stats()["shard_saturated"] == 1
@@ -0,0 +1,80 @@
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from agentturing.api.schemas import FeedbackRequest
+from agentturing.utils import traffic
+from agentturing.utils.traffic import TrafficRecorder, TrafficCaptureMiddleware
+from tools.benchmark.replay_traffic import build_request, load_capture
+
+
+def make_app(recorder):
+    app = FastAPI()
+    app.add_middleware(TrafficCaptureMiddleware, recorder=recorder)
+
+    @app.post("/ask")
+    async def ask(body: dict):
+        traffic.annotate(question=body["question"], timings={"llm": 12.5})
+        if body["question"] == "fail":
+            raise HTTPException(status_code=504)
+        traffic.annotate(route="kb")
+        return {"route": "kb"}
+
+    @app.post("/feedback")
+    async def feedback(req: FeedbackRequest):
+        traffic.annotate(question=req.question, answer=req.answer, route=req.route, rating=req.rating)
+        return {"status": "ok"}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    return app
+
+
+def test_sampled_requests_are_captured_with_status(tmp_path):
+    path = str(tmp_path / "traffic.jsonl")
+    recorder = TrafficRecorder(path, sample_rate=1.0)
+    client = TestClient(make_app(recorder))
+    client.post("/ask", json={"question": "What is 2+2? mail me at a@b.com"})
+    client.post("/ask", json={"question": "fail"})
+    client.get("/health")
+    recorder.close()
+
+    events = load_capture(path)
+    assert [(e["question"], e["status"], e.get("route")) for e in events] == [
+        ("What is 2+2? mail me at [REDACTED-EMAIL]", 200, "kb"), ("fail", 504, None)]
+    assert events[0]["timings"] == {"llm": 12.5} and events[0]["latency_ms"] >= 0
+    assert recorder.stats()["captured"] == 2
+
+
+def test_unsampled_requests_pass_through(tmp_path):
+    recorder = TrafficRecorder(str(tmp_path / "traffic.jsonl"), sample_rate=0.0)
+    assert TestClient(make_app(recorder)).post("/ask", json={"question": "x"}).json() == {"route": "kb"}
+    assert recorder.stats()["captured"] == 0
+    assert not (tmp_path / "traffic.jsonl").exists()
+
+
+def test_rotated_captures_replay_in_arrival_order(tmp_path):
+    path = str(tmp_path / "traffic.jsonl")
+    recorder = TrafficRecorder(path, sample_rate=1.0, max_bytes=200, backups=10)
+    for i in range(20):
+        recorder.record({"ts": 1000.0 + i, "kind": "ask", "question": f"question {i}", "status": 200})
+    recorder.record({"ts": 999.0, "kind": "feedback", "question": "q", "rating": 1})
+    recorder.close()
+
+    assert len(list(tmp_path.iterdir())) > 1
+    assert [e["ts"] for e in load_capture(path)] == [1000.0 + i for i in range(20)]
+    assert load_capture(path, ("feedback",))[0]["rating"] == 1
+
+
+def test_captured_feedback_replays_as_a_valid_request(tmp_path):
+    path = str(tmp_path / "traffic.jsonl")
+    recorder = TrafficRecorder(path, sample_rate=1.0)
+    client = TestClient(make_app(recorder))
+    client.post("/feedback", json={"question": "2+2?", "answer": "4, ask a@b.com", "rating": 1.0, "route": "kb"})
+    recorder.close()
+
+    event = load_capture(path, ("feedback",))[0]
+    assert event["answer"] == "4, ask [REDACTED-EMAIL]" and event["rating"] == 1.0
+    replayed, body, headers = build_request(event)
+    assert replayed == "/feedback" and body["answer"] == event["answer"]
+    assert client.post(replayed, json=body, headers=headers).status_code == 200
@@ -0,0 +1,80 @@
+"""
+Compare embedding backends (torch / onnx / onnx-int8) on the local KB:
+single-query latency, batch throughput and recall@k of ONNX neighbours against the PyTorch encoder.
+
+    python -m tools.benchmark.embedding_backends --backends torch,onnx,onnx-int8
+"""
+import os
+import time
+import argparse
+import numpy as np
+from agentturing.database.setup_knowledgebase import KB_PATH, EMBEDDING_MODEL, load_docs
+from agentturing.model.embeddings import load_embedder
+
+
+def load_queries(docs, limit):
+    """Use the KB questions themselves (first line of every Q/A pair) as the query mix."""
+    queries = []
+    for doc in docs:
+        lines = [ln for ln in doc.splitlines() if ln.strip()]
+        queries.extend(lines[0::2])
+    return queries[:limit]
+
+
+def time_queries(embedder, queries):
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        embedder.encode(q)
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies)
+
+
+def run(model_name, backends, n_queries, k, min_recall):
+    docs = load_docs(KB_PATH)
+    queries = load_queries(docs, n_queries)
+    print(f"Model {model_name}: {len(docs)} docs, {len(queries)} queries, recall@{k}")
+
+    results = {}
+    for backend in backends:
+        embedder = load_embedder(model_name, backend=backend)
+        embedder.encode(queries[:8])  # warm-up
+        latencies = time_queries(embedder, queries)
+        start = time.perf_counter()
+        doc_vecs = np.asarray(embedder.encode(docs, batch_size=32), dtype=np.float32)
+        batch_s = time.perf_counter() - start
+        query_vecs = np.asarray(embedder.encode(queries, batch_size=32), dtype=np.float32)
+        results[backend] = {
+            "p50_ms": np.percentile(latencies, 50) * 1000,
+            "p95_ms": np.percentile(latencies, 95) * 1000,
+            "docs_per_s": len(docs) / batch_s,
+            "docs": doc_vecs / np.linalg.norm(doc_vecs, axis=1, keepdims=True),
+            "queries": query_vecs / np.linalg.norm(query_vecs, axis=1, keepdims=True),
+        }
+
+    ref = results.get("torch")
+    if ref is not None:
+        ref_top = np.argsort(-ref["queries"] @ ref["docs"].T, axis=1)[:, :k]
+    print(f"{'backend':<10} {'p50 ms':>8} {'p95 ms':>8} {'docs/s':>9} {'recall':>7} {'cos':>7}")
+    best = None
+    for backend, r in results.items():
+        recall, cos = 1.0, 1.0
+        if ref is not None and backend != "torch":
+            top = np.argsort(-r["queries"] @ r["docs"].T, axis=1)[:, :k]
+            recall = float(np.mean([len(set(a) & set(b)) / k for a, b in zip(top, ref_top)]))
+            cos = float(np.mean(np.sum(r["queries"] * ref["queries"], axis=1)))
+        print(f"{backend:<10} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['docs_per_s']:>9.1f} {recall:>7.3f} {cos:>7.4f}")
+        if recall >= min_recall and (best is None or r["p50_ms"] < results[best]["p50_ms"]):
+            best = backend
+    print(f"Fastest backend with recall@{k} >= {min_recall}: {best}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8")
+    parser.add_argument("--queries", type=int, default=int(os.getenv("BENCH_QUERIES", 200)))
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--min-recall", type=float, default=0.95)
+    args = parser.parse_args()
+    run(args.model, [b.strip() for b in args.backends.split(",") if b.strip()], args.queries, args.k, args.min_recall)
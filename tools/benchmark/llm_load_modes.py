@@ -0,0 +1,67 @@
+"""
+Compare LLM_LOAD_MODE settings (default / bf16 / int8) for the local transformers LLM:
+load time, RSS after load, peak RSS, weight size and greedy decode speed. Each mode loads in a
+fresh subprocess so peak RSS is not polluted by the previous mode.
+
+    python -m tools.benchmark.llm_load_modes --model Qwen/Qwen2.5-Math-1.5B --modes default,bf16,int8
+"""
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+
+def child(model_name, mode, new_tokens, prompt_tokens):
+    import torch
+    from agentturing.model.loading import load_causal_lm, current_rss_mb, peak_rss_mb
+
+    torch.manual_seed(0)
+    model, report = load_causal_lm(model_name, mode)
+    if new_tokens:
+        vocab = model.config.vocab_size
+        input_ids = torch.randint(0, vocab, (1, prompt_tokens))
+        with torch.inference_mode():
+            model.generate(input_ids=input_ids, max_new_tokens=2, do_sample=False)  # warm-up
+            start = time.perf_counter()
+            out = model.generate(input_ids=input_ids, max_new_tokens=new_tokens, min_new_tokens=new_tokens,
+                                 do_sample=False)
+            elapsed = time.perf_counter() - start
+        generated = out.shape[1] - prompt_tokens
+        report["decode_tok_s"] = round(generated / elapsed, 1)
+        report["rss_after_generate_mb"] = round(current_rss_mb(), 1)
+        report["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    print(json.dumps(report))
+
+
+def run(model_name, modes, new_tokens, prompt_tokens):
+    print(f"Model {model_name}")
+    print(f"{'mode':<8} {'load s':>7} {'rss MB':>8} {'peak MB':>8} {'weights MB':>11} {'tok/s':>7}")
+    results = {}
+    for mode in modes:
+        cmd = [sys.executable, "-m", "tools.benchmark.llm_load_modes", "--child", mode, "--model", model_name,
+               "--new-tokens", str(new_tokens), "--prompt-tokens", str(prompt_tokens)]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"{mode:<8} failed: {proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else proc.returncode}")
+            continue
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        results[mode] = r
+        print(f"{mode:<8} {r['load_s']:>7.2f} {r['rss_after_mb']:>8.0f} {r['peak_rss_mb']:>8.0f} "
+              f"{r['weights_mb']:>11.0f} {r.get('decode_tok_s', float('nan')):>7.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="Qwen/Qwen2.5-Math-1.5B")
+    parser.add_argument("--modes", default="default,bf16,int8")
+    parser.add_argument("--new-tokens", type=int, default=32, help="Greedy tokens to time (0 = load only)")
+    parser.add_argument("--prompt-tokens", type=int, default=64)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.model, args.child, args.new_tokens, args.prompt_tokens)
+    else:
+        run(args.model, args.modes.split(","), args.new_tokens, args.prompt_tokens)
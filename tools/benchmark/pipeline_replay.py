@@ -0,0 +1,74 @@
+"""
+Run the real AgentPipeline over a fixed question mix with LLM and MCP calls recorded to, or replayed
+from, a cassette. Record once against live providers, then replay offline and deterministically:
+
+    python -m tools.benchmark.pipeline_replay --mode record --limit 50
+    python -m tools.benchmark.pipeline_replay --mode replay --latency-scale 1
+
+Replay serves responses by request content, so retrieval must see the same KB as the recording
+(same Qdrant collection and embedding model); a changed prompt shows up as a cassette miss.
+"""
+import os
+import time
+import json
+import argparse
+
+
+def load_questions(path, limit):
+    """Questions from a bench file ([{"question": ...}]) or, by default, the KB questions."""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return [item["question"] for item in json.load(f)][:limit]
+    from agentturing.database.setup_knowledgebase import KB_PATH, load_docs
+    questions = []
+    for doc in load_docs(KB_PATH):
+        lines = [ln for ln in doc.splitlines() if ln.strip()]
+        questions.extend(lines[0::2])
+    return questions[:limit]
+
+
+def run(mode, cassette_path, latency_scale, questions_path, limit):
+    # Configure before importing the pipeline: these settings are read at import time
+    os.environ["CASSETTE_MODE"] = mode
+    os.environ["CASSETTE_PATH"] = cassette_path
+    os.environ["CASSETTE_LATENCY_SCALE"] = str(latency_scale)
+    if mode == "replay":
+        os.environ["LLM_ROUTER_BACKENDS"] = "replay"
+    from agentturing.pipelines.main_pipeline import AgentPipeline
+    from agentturing.utils.cassette import get_cassette
+    from agentturing.utils.metrics import LatencyWindow
+
+    questions = load_questions(questions_path, limit)
+    pipeline = AgentPipeline()
+    overall, by_route, errors = LatencyWindow(size=len(questions) or 1), {}, 0
+    for question in questions:
+        start = time.perf_counter()
+        try:
+            route = pipeline.ask(question)["route"]
+        except Exception as e:
+            errors += 1
+            print(f"error: {type(e).__name__}: {e}")
+            continue
+        elapsed = time.perf_counter() - start
+        overall.observe(elapsed)
+        by_route.setdefault(route, LatencyWindow(size=len(questions))).observe(elapsed)
+
+    get_cassette().close()
+    print(f"{mode}: {len(questions)} questions, {errors} errors, cassette {get_cassette().stats()}")
+    print(f"{'route':<12} {'n':>5} {'p50 ms':>8} {'p95 ms':>8}")
+    for route, window in sorted(by_route.items()) + [("all", overall)]:
+        if len(window):
+            print(f"{route:<12} {len(window):>5} {window.percentile(50) * 1000:>8.1f} "
+                  f"{window.percentile(95) * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=("record", "replay"), default="replay")
+    parser.add_argument("--cassette", default="tools/benchmark/cassettes/default.jsonl.gz")
+    parser.add_argument("--latency-scale", type=float, default=0.0,
+                        help="Replay sleeps recorded latency x scale (0 = instant, 1 = as recorded)")
+    parser.add_argument("--questions", help="JSON bench file; defaults to the KB questions")
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+    run(args.mode, args.cassette, args.latency_scale, args.questions, args.limit)
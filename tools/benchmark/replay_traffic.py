@@ -0,0 +1,118 @@
+"""
+Re-issue captured /ask traffic (TRAFFIC_SAMPLE_RATE > 0 writes it to TRAFFIC_FILE) against a server,
+open-loop at the original inter-arrival times divided by --speed, so capacity tests see the real
+question mix and burstiness. Rotated files (traffic.jsonl.1, ...) are read oldest first.
+
+    python -m tools.benchmark.replay_traffic --capture captures/traffic.jsonl --url http://localhost:8000 --speed 4
+"""
+import os
+import glob
+import json
+import time
+import argparse
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from agentturing.utils.admission import DEFAULT_PRIORITY
+from agentturing.utils.metrics import LatencyWindow
+
+
+def load_capture(path, kinds=("ask",)):
+    """Captured events of the given kinds with a question, in arrival order."""
+    backups = sorted(glob.glob(f"{glob.escape(path)}.*"), key=lambda p: int(p.rsplit(".", 1)[1])
+                     if p.rsplit(".", 1)[1].isdigit() else -1, reverse=True)
+    events = []
+    for name in backups + ([path] if os.path.exists(path) else []):
+        with open(name, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                if event.get("kind") in kinds and event.get("question"):
+                    events.append(event)
+    return sorted(events, key=lambda e: e["ts"])
+
+
+def build_request(event):
+    """Path, JSON body and headers that re-issue one captured event."""
+    if event["kind"] == "feedback":
+        # The captured (redacted) answer and rating, so the body validates as a FeedbackRequest
+        body = {"question": event["question"], "answer": event.get("answer") or "",
+                "rating": event.get("rating"), "route": event.get("route")}
+        return "/feedback", body, {}
+    return "/ask", {"question": event["question"]}, {"X-Priority": event.get("priority") or DEFAULT_PRIORITY}
+
+
+def replay(events, url, speed=1.0, workers=256, timeout=60.0):
+    # The connection pool must not cap concurrency below the worker count either
+    client = httpx.Client(base_url=url, timeout=timeout,
+                          limits=httpx.Limits(max_connections=workers, max_keepalive_connections=workers))
+    lock = threading.Lock()
+    size = len(events) or 1
+    statuses, latency, lag = Counter(), LatencyWindow(size=size), LatencyWindow(size=size)
+    by_route = defaultdict(lambda: LatencyWindow(size=size))
+
+    def send(event, due_at):
+        start = time.perf_counter()
+        # Lag is measured when the request actually goes out: once every worker is busy, requests
+        # queue in the pool and the replay stops being open-loop
+        lag.observe(max(0.0, start - due_at))
+        path, body, headers = build_request(event)
+        try:
+            resp = client.post(path, json=body, headers=headers)
+            status, route = resp.status_code, resp.json().get("route") if resp.status_code == 200 else None
+        except (httpx.HTTPError, ValueError) as e:
+            status, route = type(e).__name__, None
+        elapsed = time.perf_counter() - start
+        latency.observe(elapsed)
+        with lock:
+            statuses[status] += 1
+            window = by_route[route] if route else None
+        if window is not None:
+            window.observe(elapsed)
+
+    # Open loop: requests are sent on schedule whether or not earlier ones have finished,
+    # as long as fewer than ``workers`` are in flight
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        origin, began = events[0]["ts"] if events else 0.0, time.perf_counter()
+        for event in events:
+            due_at = began + (event["ts"] - origin) / speed
+            delay = due_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, event, due_at)
+    client.close()
+    return {"statuses": statuses, "latency": latency, "by_route": by_route, "lag": lag,
+            "wall_s": time.perf_counter() - began}
+
+
+def report(result, n):
+    lag = result["lag"]
+    print(f"Replayed {n} requests in {result['wall_s']:.1f}s (send lag p95 "
+          f"{(lag.percentile(95) or 0.0) * 1000:.0f} ms, max {(lag.percentile(100) or 0.0) * 1000:.0f} ms)")
+    if (lag.percentile(95) or 0.0) > 0.1:
+        print("Requests went out late: raise --workers to keep the replay open-loop")
+    print("Statuses:", dict(result["statuses"]))
+    print(f"{'route':<12} {'n':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, window in sorted(result["by_route"].items()) + [("all", result["latency"])]:
+        if len(window):
+            print(f"{route:<12} {len(window):>5} {window.percentile(50) * 1000:>8.1f} "
+                  f"{window.percentile(95) * 1000:>8.1f} {window.percentile(99) * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--capture", default=os.getenv("TRAFFIC_FILE", "captures/traffic.jsonl"))
+    parser.add_argument("--url", default=os.getenv("API_BASE_URL", "http://localhost:8000"))
+    parser.add_argument("--speed", type=float, default=1.0, help="Time compression (2 = twice the original rate)")
+    parser.add_argument("--limit", type=int, default=0, help="Replay only the first N requests (0 = all)")
+    parser.add_argument("--workers", type=int, default=256, help="Maximum requests in flight")
+    parser.add_argument("--include-feedback", action="store_true",
+                        help="Also replay /feedback (writes rows to the target's feedback DB)")
+    args = parser.parse_args()
+
+    events = load_capture(args.capture, ("ask", "feedback") if args.include_feedback else ("ask",))
+    if args.limit:
+        events = events[:args.limit]
+    report(replay(events, args.url, args.speed, args.workers), len(events))